@@ -0,0 +1,176 @@
+"""
+A compact binary format for parsed songs, much faster to load than parsing the song again.
+
+Layout (little-endian):
+    header: magic b'SKYS', format version (H)
+    song: locale, music key (strings), meta changed flag (B), number of meta entries (H),
+          then for each entry: key, label, value (strings)
+    grids: number of grids (I), then for each grid: rows, columns, number of frames (BBH), one mask (Q) per frame
+    lines: number of lines (I), then for each line: number of instruments (I), then for each instrument:
+          kind (B), repeat (I), and
+          harp/drum: flags (B), grid number (I)
+          voice: lyric, emphasis (strings)
+          ruler/layer: code, text, emphasis (strings)
+Strings are UTF-8 bytes prefixed with their length (I).
+"""
+import struct
+from skymusic import instruments, sheetlayout
+from skymusic.song import Song
+
+MAGIC = b'SKYS'
+VERSION = 1
+
+KINDS = ('harp', 'drum', 'voice', 'ruler', 'layer') # The kind of an instrument is the index of its type
+TONAL_CLASSES = {'harp': instruments.Harp, 'drum': instruments.Drum}
+BROKEN = 1
+SILENT = 2
+
+_HEADER = struct.Struct('<4sH')
+_COUNT = struct.Struct('<I')
+_META = struct.Struct('<BH')
+_GRID = struct.Struct('<BBH')
+_MASK = struct.Struct('<Q')
+_KIND = struct.Struct('<BI')
+_HARP = struct.Struct('<BI')
+
+
+def _pack_string_(chunks, text):
+    data = (text or '').encode('utf-8')
+    chunks.append(_COUNT.pack(len(data)))
+    chunks.append(data)
+
+
+def dumps(song):
+    '''Returns the bytes of the song in binary format'''
+    chunks = [_HEADER.pack(MAGIC, VERSION)]
+
+    _pack_string_(chunks, song.locale)
+    _pack_string_(chunks, song.get_music_key())
+    meta = song.get_meta()
+    chunks.append(_META.pack(int(song.get_meta_changed()), len(meta)))
+    for key, (label, value) in meta.items():
+        for text in (key, label, str(value)): _pack_string_(chunks, text)
+
+    grid_ids = {} #signature: grid number
+    line_chunks = [_COUNT.pack(song.get_num_lines())]
+    for line in song.get_lines():
+        line_chunks.append(_COUNT.pack(len(line)))
+        for instrument in line:
+            instr_type = instrument.get_type()
+            try:
+                kind = KINDS.index(instr_type)
+            except ValueError:
+                raise TypeError(f"Cannot write instrument of type '{instr_type}' in binary format")
+            line_chunks.append(_KIND.pack(kind, instrument.get_repeat()))
+            if instr_type in TONAL_CLASSES:
+                signature = instrument.get_signature()
+                grid_id = grid_ids.setdefault(signature, len(grid_ids))
+                flags = BROKEN*instrument.get_is_broken() + SILENT*instrument.get_is_silent()
+                line_chunks.append(_HARP.pack(flags, grid_id))
+            elif instr_type == 'voice':
+                _pack_string_(line_chunks, instrument.get_lyric())
+                _pack_string_(line_chunks, instrument.emphasis)
+            else:
+                _pack_string_(line_chunks, instrument.get_code())
+                _pack_string_(line_chunks, instrument.get_text())
+                _pack_string_(line_chunks, instrument.get_emphasis())
+
+    chunks.append(_COUNT.pack(len(grid_ids)))
+    for (shape, masks) in grid_ids: # Dicts keep insertion order, which is the grid number
+        chunks.append(_GRID.pack(shape[0], shape[1], len(masks)))
+        chunks += [_MASK.pack(mask) for mask in masks]
+
+    return b''.join(chunks + line_chunks)
+
+
+def dump(song, fp):
+    '''Writes the song in binary format to a file opened in binary mode'''
+    fp.write(dumps(song))
+
+
+class _Reader():
+    '''Unpacks values from the bytes of a binary song'''
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def string(self):
+        (length,) = _COUNT.unpack_from(self.data, self.offset)
+        start = self.offset + _COUNT.size
+        if start + length > len(self.data):
+            raise ValueError(f"Corrupted song in binary format: string of {length} bytes truncated at byte {len(self.data)}")
+        self.offset = start + length
+        return str(self.data[start:self.offset], 'utf-8')
+
+
+def loads(data, song_class=Song):
+    '''Returns a new Song, or an instance of song_class, from bytes in binary format'''
+    reader = _Reader(data)
+    try:
+        (magic, version) = reader.unpack(_HEADER)
+    except struct.error:
+        raise ValueError("Data is too short to be a song in binary format")
+    if magic != MAGIC:
+        raise ValueError("Data is not a song in binary format")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary song version {version}, expected {VERSION}")
+
+    try:
+        locale = reader.string() or None
+        song = song_class(locale=locale, music_key=reader.string())
+        (meta_changed, num_meta) = reader.unpack(_META)
+        for _ in range(num_meta):
+            (key, label, value) = (reader.string(), reader.string(), reader.string())
+            song.meta[key] = [label, value]
+        song.set_meta_changed(bool(meta_changed))
+
+        grids = []
+        (num_grids,) = reader.unpack(_COUNT)
+        for _ in range(num_grids):
+            (rows, cols, num_frames) = reader.unpack(_GRID)
+            skygrid = instruments.Skygrid(shape=(rows, cols))
+            skygrid.set_masks(reader.unpack(_MASK)[0] for _ in range(num_frames))
+            grids.append(instruments.Skygrid.intern(skygrid))
+
+        (num_lines,) = reader.unpack(_COUNT)
+        for _ in range(num_lines):
+            (num_instruments,) = reader.unpack(_COUNT)
+            line = []
+            for _ in range(num_instruments):
+                (kind, repeat) = reader.unpack(_KIND)
+                instr_type = KINDS[kind]
+                if instr_type in TONAL_CLASSES:
+                    (flags, grid_id) = reader.unpack(_HARP)
+                    instrument = TONAL_CLASSES[instr_type]()
+                    instrument.set_skygrid(grids[grid_id])
+                    instrument.set_is_broken(bool(flags & BROKEN))
+                    instrument.set_is_silent(bool(flags & SILENT))
+                elif instr_type == 'voice':
+                    instrument = instruments.Voice()
+                    instrument.lyric = reader.string()
+                    instrument.emphasis = reader.string() or None
+                else:
+                    instrument = sheetlayout.Layer() if instr_type == 'layer' else sheetlayout.Ruler()
+                    code = reader.string()
+                    if code: instrument.set_code(code)
+                    instrument.text = reader.string()
+                    instrument.emphasis = reader.string()
+                instrument.set_repeat(repeat)
+                line.append(instrument)
+            song.add_line(line)
+    except (struct.error, IndexError, KeyError, UnicodeDecodeError) as err:
+        raise ValueError(f"Corrupted song in binary format: {err}")
+    if reader.offset != len(reader.data):
+        raise ValueError(f"Corrupted song in binary format: {len(reader.data) - reader.offset} bytes after the last line")
+
+    return song
+
+
+def load(fp, song_class=Song):
+    '''Reads a Song from a file opened in binary mode'''
+    return loads(fp.read(), song_class)
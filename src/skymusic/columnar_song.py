@@ -0,0 +1,104 @@
+"""A Song storing its identical lines and instruments once, for very large songs such as MIDI imports"""
+from array import array
+from collections.abc import Sequence
+from skymusic import instruments
+from skymusic.song import Song
+
+class ColumnarLines(Sequence):
+    '''
+    Read-only view of the lines of a ColumnarSong, as lists of Instruments.
+    Identical lines are the same shared list of shared Instruments, see ColumnarSong.
+    '''
+    def __init__(self, song):
+        self.song = song
+
+    def __len__(self):
+        return len(self.song.shared_lines)
+
+    def __getitem__(self, row):
+        return self.song.shared_lines[row]
+
+    def __iter__(self):
+        return iter(self.song.shared_lines)
+
+
+class ColumnarSong(Song):
+    '''
+    A Song whose identical lines are stored once, instead of one list of Instrument objects per line.
+    Harps and drums with the same type, repeat, broken/silent flags and grid share a single Instrument:
+    grids are interned Skygrids, referenced by their index in a table shared by the whole song.
+    Other instruments (voices, rulers, layers) are few, and are kept as they are.
+    Lines with the same Instruments share a single list, so a song repeating its lines takes one reference per line.
+    get_lines(), get_line() and get_instrument() return these shared lists and Instruments, so renderers can use
+    a ColumnarSong like a Song, but must not modify them, except for the index of Instruments.
+    Statistics and digest are computed by Song as lines are added.
+    '''
+    TONAL_TYPES = (instruments.Harp, instruments.Drum) #Kind is the index in this tuple
+    BROKEN = 1
+    SILENT = 2
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self.shared_lines = [] #Each line, as a reference to the shared list of its shared Instruments
+        self._shared_lines_ = {} #Bytes of the indices of the Instruments of a line: shared line
+        self.instruments = [] #Shared Instruments
+        self._instrument_ids_ = {} #(kind, grid index, repeat, flags) of a harp or drum: index in self.instruments
+        self.grids = [] #Interned Skygrids
+        self._grid_ids_ = {} #Skygrid signature: index in self.grids
+        self.lines = ColumnarLines(self)
+
+    @classmethod
+    def from_song(cls, song):
+        '''Copies a Song into a new ColumnarSong'''
+        columnar_song = cls(locale=song.locale, music_key=song.get_music_key())
+        for k, v in song.get_meta().items():
+            columnar_song.meta[k] = list(v)
+        columnar_song.set_meta_changed(song.get_meta_changed())
+        for line in song.get_lines():
+            columnar_song.add_line(line)
+        return columnar_song
+
+    def get_grid_id(self, skygrid):
+        '''Returns the index of the skygrid in the table of grids, adding it if needed'''
+        signature = skygrid.get_signature()
+        try:
+            return self._grid_ids_[signature]
+        except KeyError:
+            self.grids.append(instruments.Skygrid.intern(skygrid))
+            self._grid_ids_[signature] = len(self.grids) - 1
+            return len(self.grids) - 1
+
+    def get_instrument_id(self, instrument):
+        '''Returns the index in self.instruments of the shared Instrument equal to instrument, adding it if needed'''
+        try:
+            kind = self.TONAL_TYPES.index(type(instrument))
+        except ValueError: # Other instruments are never shared
+            self.instruments.append(instrument)
+            return len(self.instruments) - 1
+        flags = self.BROKEN*instrument.get_is_broken() + self.SILENT*instrument.get_is_silent()
+        key = (kind, self.get_grid_id(instrument.get_skygrid()), instrument.get_repeat(), flags)
+        try:
+            return self._instrument_ids_[key]
+        except KeyError:
+            shared_instrument = self.TONAL_TYPES[kind]()
+            shared_instrument.set_skygrid(self.grids[key[1]])
+            shared_instrument.set_repeat(key[2])
+            shared_instrument.set_is_broken(bool(flags & self.BROKEN))
+            shared_instrument.set_is_silent(bool(flags & self.SILENT))
+            self.instruments.append(shared_instrument)
+            self._instrument_ids_[key] = len(self.instruments) - 1
+            return len(self.instruments) - 1
+
+    def add_line(self, line):
+        """Adds a line of Instrument to the Song"""
+        if len(line) == 0: return
+        instrument_ids = array('I', [self.get_instrument_id(instrument) for instrument in line])
+        key = instrument_ids.tobytes()
+        try:
+            shared_line = self._shared_lines_[key]
+        except KeyError:
+            shared_line = self._shared_lines_[key] = [self.instruments[i] for i in instrument_ids]
+        self.shared_lines.append(shared_line)
+        self._count_line_(line)
+        self._hash_line_(line)
@@ -1,16 +1,33 @@
-import re
+import re, weakref
 from skymusic import notes
 
+try:
+    popcount = int.bit_count
+except AttributeError: # Python < 3.10
+    def popcount(mask): return bin(mask).count('1')
+
 
 class Skygrid():
-    
+    """
+    The notes of an icon, stored as one integer bitmask per frame.
+    Bit i of a mask is set when the note of index i = row*num_columns + column is highlighted in that frame.
+    Frame 0 is the normal frame, frames >= 1 are for notes of a triplet or quaver.
+    """
+    __slots__ = ('shape', 'masks', 'frozen', '_num_frames', '_num_highlighted', '_max_num_by_frame', '__weakref__')
+
+    _coords_by_mask = {} #(num_columns, mask): tuple of coords, shared by all grids, oldest first
+    _max_coords_by_mask = 4096
+    _interned = weakref.WeakValueDictionary() #signature: frozen Skygrid, shared by all songs, kept while used
+
     def __init__(self, shape=(3,5)):
         
         self.shape = shape #rows*columns, excluding negative coordinates, reserved for silences
-        self.grid = {}
-        self.inverse_grid = {} #Only highlighted notes
-        #self._num_frames = 0
-        self._num_by_frame = {}
+        self.masks = [] #masks[frame] is the bitmask of highlighted notes in that frame
+        self.frozen = False #Interned grids are shared, so they must not be modified
+        # Counters kept up to date by set_note
+        self._num_frames = 0
+        self._num_highlighted = 0
+        self._max_num_by_frame = 0
 
     def get_num_rows(self): return self.shape[0]
 
@@ -18,14 +35,125 @@ class Skygrid():
 
     def get_shape(self): return self.shape
 
+    def get_masks(self):
+        '''Returns the list of bitmasks, indexed by frame'''
+        return self.masks
+
+    def set_masks(self, masks):
+        if self.frozen: raise TypeError("Cannot modify a frozen Skygrid")
+        self.masks = list(masks)
+        self._count_notes_()
+
+    def _count_notes_(self):
+        '''Recomputes the counters from scratch'''
+        nums = [popcount(mask) for mask in self.masks]
+        self._num_frames = len(nums) - nums.count(0)
+        self._num_highlighted = sum(nums)
+        self._max_num_by_frame = max(nums, default=0)
+
+    def get_mask(self, frame=0):
+        '''Returns the bitmask of the highlighted notes in frame, 0 if the frame does not exist'''
+        try:
+            return self.masks[frame] if frame >= 0 else 0
+        except IndexError:
+            return 0
+
+    def is_in_shape(self, coord):
+        '''Returns whether coord is a note of the grid or a silence (negative coordinates)'''
+        (row, col) = coord
+        return row < self.shape[0] and col < self.shape[1]
+
+    def get_bit(self, coord):
+        '''
+        Returns the bit of the note at coord, or 0 for negative coordinates (silences).
+        Raises ValueError if coord is outside the grid, as its bit would be the one of another note.
+        '''
+        (row, col) = coord
+        if row < 0 or col < 0:
+            return 0
+        if not self.is_in_shape(coord):
+            raise ValueError(f"Coordinate {coord} is outside the {self.shape[0]}x{self.shape[1]} grid")
+        return 1 << (row * self.shape[1] + col)
+
+    def get_coords_from_mask(self, mask):
+        '''Returns the sorted tuple of coordinates whose bits are set in mask'''
+        key = (self.shape[1], mask)
+        try:
+            return Skygrid._coords_by_mask[key]
+        except KeyError:
+            coords = []
+            index = 0
+            while mask >> index:
+                if (mask >> index) & 1: coords.append(divmod(index, self.shape[1]))
+                index += 1
+            coords = tuple(coords)
+            if len(Skygrid._coords_by_mask) >= Skygrid._max_coords_by_mask:
+                del Skygrid._coords_by_mask[next(iter(Skygrid._coords_by_mask))]
+            Skygrid._coords_by_mask[key] = coords
+            return coords
+
+    def get_signature(self):
+        '''
+        Returns a hashable key identifying the content of the grid: (shape, masks without trailing empty frames)
+        Grids with the same signature are rendered identically, so it can be used as a cache key.
+        '''
+        masks = self.masks
+        end = len(masks)
+        while end and not masks[end-1]: end -= 1
+        return (self.shape, tuple(masks[:end]))
+
+    def freeze(self):
+        '''Makes the grid immutable'''
+        self.masks = tuple(self.masks)
+        self.frozen = True
+        return self
+
+    @classmethod
+    def intern(cls, skygrid):
+        '''Returns the frozen grid shared by all grids with the same signature as skygrid'''
+        signature = skygrid.get_signature()
+        try:
+            return cls._interned[signature]
+        except KeyError:
+            grid = cls(shape=skygrid.shape)
+            grid.set_masks(signature[1])
+            cls._interned[signature] = grid.freeze()
+            return grid
+
+    @classmethod
+    def from_masks(cls, shape, masks, frozen=False):
+        '''Returns a grid with the given masks, or the shared interned grid if frozen'''
+        grid = cls(shape=shape)
+        grid.set_masks(masks)
+        return cls.intern(grid) if frozen else grid
+
+    def __reduce__(self):
+        return (self.__class__.from_masks, (self.shape, tuple(self.masks), self.frozen))
+
     def set_note(self, coord, frame=None, highlighted=True):
         
-        frames = [frame] if frame is not None else range(0,max(1,self.get_num_frames()))
-        for frame in frames: self.grid[coord] = {frame: highlighted}
-        # Reset counters
-        self._num_by_frame = {}
-        #self._num_frames = 0
-        self.inverse_grid = {}
+        if self.frozen: raise TypeError("Cannot modify a frozen Skygrid")
+        bit = self.get_bit(coord)
+        if not bit: return # Silences are not stored
+        masks = self.masks
+        frames = [frame] if frame is not None else (self.get_highlighted_frames() or [0])
+        for frame in frames:
+            if frame >= len(masks): masks.extend([0]*(frame + 1 - len(masks)))
+            old_mask = masks[frame]
+            mask = (old_mask | bit) if highlighted else (old_mask & ~bit)
+            if mask == old_mask: continue
+            masks[frame] = mask
+            # Updates counters with the added or removed note
+            if highlighted:
+                self._num_highlighted += 1
+                if not old_mask: self._num_frames += 1
+                num = popcount(mask)
+                if num > self._max_num_by_frame: self._max_num_by_frame = num
+            else:
+                self._num_highlighted -= 1
+                if not mask: self._num_frames -= 1
+                if popcount(old_mask) == self._max_num_by_frame:
+                    self._max_num_by_frame = max(map(popcount, masks))
 
 
     def get_grid(self, frame=None):
@@ -40,111 +168,87 @@ class Skygrid():
         Full Example: {(0,0):{0:True}, (1,1):{0:True, 1:True}}
         0 frame is the normal frame
         >1 frames are for notes of a triplet or quaver
+        This dictionary is built from the bitmasks at each call.
         """
-        if frame is None:
-            return self.grid
-        else:
+        if frame is not None:
             if frame < 0 or frame > self.get_num_frames()-1:
                 return None
-            else:
-                #return {coord:frames for coord,frames in self.grid.items() if frame in list(filter(lambda k:frames[k] is True, frames))}
-                return {coord:frames for coord,frames in self.grid.items() if frame in frames.keys()}
+        grid = {}
+        for f, mask in enumerate(self.masks):
+            if frame is None or f == frame:
+                for coord in self.get_coords_from_mask(mask):
+                    grid.setdefault(coord, {})[f] = True
+        return grid
 
 
     def get_inverse_grid(self):
-        '''Builds the inverse dictionary, keeping None notes'''
-        if not self.inverse_grid:
-            inverse_grid = {}
-            for coord in self.grid:
-                for f in self.grid[coord]:
-                    if self.grid[coord][f]: inverse_grid[f] = inverse_grid.get(f,[]) + [coord]
-            self.inverse_grid = inverse_grid 
-        return self.inverse_grid
+        '''Builds the inverse dictionary {frame: [coords]}, with highlighted frames only'''
+        return {f: list(self.get_coords_from_mask(mask)) for f, mask in enumerate(self.masks) if mask}
 
 
     def get_highlighted_frames(self, note_coord=None):
         '''Returns a list of frame numbers in which the note at coord is highlighted'''
+        masks = self.masks
         if note_coord is None: # Try all coords
-            #note_coords = self.grid.keys()
-            return sorted(self.get_inverse_grid().keys())
+            if len(masks) == 1:
+                return [0] if masks[0] else []
+            return [f for f, mask in enumerate(masks) if mask]
         else: # Test for specified note only
-            note_frames = self.grid.get(note_coord, {})
-            highlighted_frames = sorted([f for f in note_frames.keys() if note_frames[f] is True])
-
-    
-        return sorted(list(set(highlighted_frames)))
+            if not self.is_in_shape(note_coord): return []
+            bit = self.get_bit(note_coord)
+            if len(masks) == 1: # Fast path for simple chords
+                return [0] if masks[0] & bit else []
+            return [f for f, mask in enumerate(masks) if mask & bit]
 
 
     def get_highlighted_coords(self, frame=None):
-        '''Returns a list of coordinates of highlighted notes, only in the specified frame, removing invalid notes'''
-        
-        inverse_grid = self.get_inverse_grid()
-        frames = [frame] if frame is not None else range(0,self.get_num_frames())
+        '''Returns a list of coordinates of highlighted notes, only in the specified frame'''
+        if frame is not None:
+            return list(self.get_coords_from_mask(self.get_mask(frame)))
+
         highlighted_coords = []
-        for frame in frames:
-            highlighted_coords += list(filter(None,inverse_grid[frame]))
-        #grid = instrument.get_grid(frame)
-        #highlighted_coords = []
-        #frames = [frame] if frame is not None else range(0,self.get_num_frames())
-        #grid = self.get_grid(frame)
-        #if self.grid:
-            #for frame in frames:
-                #for coord in self.grid:  # Cycle over (row, col) coords in an icon
-                    #highlighted = self.grid[coord].get(frame,False)  # Button is highlighted
-                    #if highlighted: highlighted_coords += [coord]
-        
+        for mask in self.masks:
+            highlighted_coords += self.get_coords_from_mask(mask)
         return sorted(highlighted_coords)
 
 
     def get_num_frames(self):
         '''Returns the number of highlighted frames'''
-        #if not self._num_frames:
-            
-        return len(self.get_inverse_grid())    
-            #num_frames = [max(list(self.grid[coord].keys()))+1 for coord in self.grid.keys()]
-            
-            #if num_frames:
-                #self._num_frames = max(num_frames)
-            #else:
-                #self._num_frames = 0
-            
-        #return self._num_frames 
+        return self._num_frames
 
     def get_num_highlighted(self, frame=None):
         '''Returns the number of highlighted notes, in specified frame or all frames'''
-        if not self._num_by_frame: self.get_num_by_frame()
-        return self._num_by_frame.get(frame, None) if frame is not None else sum(self._num_by_frame.values())
+        if frame is not None:
+            mask = self.get_mask(frame)
+            return popcount(mask) if mask else None
+        return self._num_highlighted
 
 
     def get_num_by_frame(self):
         '''number of highlighted notes in a frame'''
-        if not self._num_by_frame: 
-            #num_highlighted = {f:0 for f in range(0,self.get_num_frames())}
-            #for coord in self.grid:
-                #for f in self.grid[coord]:
-                    #if self.grid[coord][f]: num_highlighted[f] += 1
-            inverse_grid = self.get_inverse_grid()
-            self._num_by_frame = {f: len(inverse_grid[f]) for f in inverse_grid}
-        return self._num_by_frame
+        return {f: popcount(mask) for f, mask in enumerate(self.masks) if mask}
 
 
     def get_max_num_by_frame(self):
-        num_by_frame = self.get_num_by_frame()
-        if num_by_frame:
-            return max(num_by_frame.values())
-        else:
-            return 0
+        return self._max_num_by_frame
                  
 
 class Instrument():
 
     type = 'GenericInstrument'
+    state_attrs = ('repeat', 'index', 'is_silent', 'is_broken') # Attributes saved by pickle
     def __init__(self):
         self.repeat = 1
         self.index = 0
         self.is_silent = True
         self.is_broken = False
 
+    def __reduce__(self):
+        return (self.__class__, (), tuple(getattr(self, attr) for attr in self.state_attrs))
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.state_attrs, state): setattr(self, attr, value)
+
     @property
     def is_tonal(self): return self.get_is_tonal()
     
@@ -200,6 +304,7 @@ class Instrument():
 
 class Voice(Instrument):  # Lyrics or comments
     type = 'voice'
+    state_attrs = Instrument.state_attrs + ('lyric', 'emphasis')
     TAG_RE = re.compile(r'<[^>]+>')
     def __init__(self):
         super().__init__()
@@ -246,11 +351,15 @@ class Harp(Instrument):
     '''Any harmonic instrument with a 3x5 grid'''
     type = 'harp'
     shape = (3, 5)
+    state_attrs = Instrument.state_attrs + ('skygrid',)
     def __init__(self):
         super().__init__()
         self.skygrid = Skygrid(shape=self.shape) #do not change name as it is used by get_is_tonal() and get_is_textual()
         
     def __getattr__(self, attr_name):
+        # Only called for attributes missing from the Harp. skygrid itself is missing while unpickling
+        if attr_name == 'skygrid' or attr_name.startswith('__'):
+            raise AttributeError(attr_name)
         return getattr(self.skygrid, attr_name)
 
     def get_is_dead(self):
@@ -0,0 +1,121 @@
+"""A Song that parses its lines only when they are accessed, for previews of long songs"""
+import copy, hashlib
+from collections.abc import Sequence
+from skymusic.song import Song
+
+class LazyLines(Sequence):
+    '''View of the lines of a LazySong, parsing each line the first time it is accessed'''
+    def __init__(self, song):
+        self.song = song
+
+    def __len__(self):
+        return len(self.song.parsed_lines)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[r] for r in range(*row.indices(len(self)))]
+        return self.song.get_parsed_line(row)
+
+
+class LazySong(Song):
+    '''
+    A Song storing the sanitized source lines, and parsing each line the first time it is accessed through
+    get_line(), get_lines() or get_instrument(). Parsed lines are kept.
+    The number of lines and instruments are counted without parsing notes, so renderers can lay out the first
+    page without parsing the whole song. Statistics depending on the notes, and the content hash, parse all lines.
+    '''
+    def __init__(self, parser, song_key, note_shift, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self.parser = copy.copy(parser) # Later changes of the parser settings must not affect the song
+        self.song_key = song_key
+        self.note_shift = note_shift
+        self.source_lines = [] # Sanitized line, or None once parsed
+        self.parsed_lines = [] # List of instruments, or None until parsed
+        self.is_complete = True # Whether all lines have been parsed and counted
+        self.lines = LazyLines(self)
+
+    def add_source_line(self, line):
+        """Adds a line of text to the Song, to be parsed later"""
+        line = self.parser.sanitize_line(line)
+        num_instruments = self.parser.count_instruments(line)
+        if num_instruments > 0:
+            self.source_lines.append(line)
+            self.parsed_lines.append(None)
+            self._count_length_(num_instruments)
+
+    def add_line(self, line):
+        """Adds a line of Instrument to the Song"""
+        if len(line) > 0:
+            self.source_lines.append(None)
+            self.parsed_lines.append(line)
+            self._count_length_(len(line))
+
+    def _count_length_(self, num_instruments):
+        self._num_instruments += num_instruments
+        self._max_instruments_per_line = max(self._max_instruments_per_line, num_instruments)
+        self.is_complete = False
+
+    def get_parsed_line(self, row):
+        """Returns line #row, parsing it if needed"""
+        line = self.parsed_lines[row]
+        if line is None:
+            line = self.parser.parse_line(self.source_lines[row], self.song_key, self.note_shift)
+            self.parsed_lines[row] = line
+            self.source_lines[row] = None
+        return line
+
+    def parse_all(self):
+        """Parses all the lines not parsed yet, and counts the statistics depending on their notes"""
+        if self.is_complete: return
+        # Song statistics and digest are recomputed in line order
+        self._num_instruments = 0
+        self._num_broken = 0
+        self._max_instruments_per_line = 0
+        self._harp_type = None
+        self._harp_aspect_ratio = None
+        self._lines_digest = hashlib.sha256()
+        for row in range(len(self.parsed_lines)):
+            line = self.get_parsed_line(row)
+            self._count_line_(line)
+            self._hash_line_(line)
+        self.is_complete = True
+
+    def __reduce__(self):
+        # Pickled as the Song of its parsed lines, without the parser
+        self.parse_all()
+        return (Song,) + super().__reduce__()[1:]
+
+    def get_textual_lines(self):
+        # Only lines starting with a lyric delimiter can be textual
+        lines = []
+        for row, source_line in enumerate(self.source_lines):
+            if source_line is None or source_line[0] == self.parser.lyric_delimiter:
+                line = self.get_parsed_line(row)
+                if line[0].is_textual: lines += [line]
+        return lines
+
+    def get_harp_aspect_ratio(self):
+        if not self.is_complete: # Parses lines until the first harp
+            for line in self.lines:
+                try:
+                    return line[0].get_aspect_ratio()
+                except AttributeError:
+                    pass
+        return super().get_harp_aspect_ratio()
+
+    def get_harp_type(self):
+        if not self.is_complete: # Parses lines until the first tonal instrument
+            for line in self.lines:
+                if line[0].get_is_tonal():
+                    return line[0].get_type()
+        return super().get_harp_type()
+
+    def get_num_broken(self):
+        """Returns the number of broken instruments in the Song"""
+        self.parse_all()
+        return super().get_num_broken()
+
+    def content_hash(self):
+        self.parse_all()
+        return super().content_hash()
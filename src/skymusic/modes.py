@@ -58,8 +58,8 @@ class InputMode(Enum):
     def get_long_desc(self, locale='en_US'):
         return Lang.get_string(self.long_desc_yaml, locale)
 
-    def get_note_parser(self, *args, **kwargs):
-        return self.note_parser_method(*args, **kwargs)
+    def get_note_parser(self, **kwargs):
+        return self.note_parser_method.get_shared(**kwargs)
 
 
 class RenderMode(Enum):
@@ -114,8 +114,8 @@ class RenderMode(Enum):
     def get_short_desc(self, locale='en_US'):
         return Lang.get_string(self.short_desc_yaml, locale)
 
-    def get_note_parser(self, *args, **kwargs):
-        return self.note_parser_method(*args, **kwargs)
+    def get_note_parser(self, **kwargs):
+        return self.note_parser_method.get_shared(**kwargs)
 
     def get_mime_type(self): return self.mime_type
 
@@ -255,9 +255,9 @@ class GamepadLayout(Enum):
     def get_long_desc(self, locale='en_US'):
         return Lang.get_string(self.short_desc_yaml, locale)
 
-    def get_note_parser(self, *args, **kwargs):
+    def get_note_parser(self, **kwargs):
         if 'layout' not in kwargs: kwargs.update({'layout': self.nickname})
-        return self.note_parser_method(*args, **kwargs)
+        return self.note_parser_method.get_shared(**kwargs)
     
     def get_nickname(self):
         return self.nickname
@@ -2,6 +2,7 @@ import os, io, re
 from skymusic.modes import InputMode, CSSMode, RenderMode, ReplyType, AspectRatio, GamePlatform, GamepadLayout, InstrumentType, ColorTheme, Locutor
 from skymusic.communicator import Communicator, QueriesExecutionAbort
 from skymusic.parsers.song_parser import SongParser
+from skymusic.parsers.incremental_parser import IncrementalSongParser
 from skymusic.renderers.song_renderers.song_renderer import SongRenderer
 from skymusic.renderers.song_renderers import skyjson_sr
 from skymusic import Lang, FileUtils
@@ -112,6 +113,7 @@ class MusicSheetMaker:
         self.communicator = Communicator(owner=self, locale=self.locale)
         self.song = None
         self.song_parser = None
+        self.parsing_session = None
         self.application_root = application_root if application_root is not None else os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
         self.song_in_dir = song_in_dir if song_in_dir is not None else os.path.join(self.application_root, 'test_songs')
         self.song_out_dir = song_out_dir if song_out_dir is not None else os.path.join(self.application_root, 'songs_out')
@@ -795,7 +797,12 @@ class MusicSheetMaker:
 
         self.get_song().set_meta(title=title, artist=artist, transcript=transcript, song_key=song_key)
 
-    def parse_song(self, recipient, notes=None, song_key=None, octave_shift=None):
+    def parse_song(self, recipient, notes=None, song_key=None, octave_shift=None, incremental=False):
+        """
+        Parses the notes into the Song of the maker.
+        If incremental is True, only the lines changed since the last incremental parse are parsed again,
+        and the indices of these lines in the Song are returned
+        """
 
         if notes is None:
             notes = self.retrieve_notes(recipient)
@@ -806,7 +813,15 @@ class MusicSheetMaker:
         if song_key is None:
             song_key = self.retrieve_query_result(recipient, '_key', Resources.DEFAULT_KEY)
 
-        
+        if incremental:
+            if self.parsing_session is None:
+                self.parsing_session = IncrementalSongParser(self.get_song_parser())
+            else: # The song parser may have been replaced since the last parse
+                self.parsing_session.song_parser = self.get_song_parser()
+            (song, changed_lines) = self.parsing_session.parse_song(notes, song_key, octave_shift)
+            self.set_song(song)
+            return changed_lines
+
         song = self.get_song_parser().parse_song(song_lines=notes, song_key=song_key, octave_shift=octave_shift)
 
         self.set_song(song)
@@ -1,13 +1,50 @@
+from collections import namedtuple
+from skymusic.resources import Resources
+
+# Description of a note position in a Skygrid, shared by all notes at the same coord in instruments of the same shape
+# buttons is a dict {gamepad layout nickname: button name}
+NoteInfo = namedtuple('NoteInfo', ['index', 'coord', 'aspect', 'row_name', 'semitone', 'buttons'])
+
+_note_tables = {} #shape: {coord: NoteInfo}
+
+def make_note_info(shape, coord, layouts=()):
+    '''Describes the note at coord in an instrument of the given shape, with its buttons in the gamepad layouts'''
+    (row, col) = coord
+    cols = shape[1]
+    index = row * cols + col
+    if index % 7 == 0:  # the 7 comes from the heptatonic scale of Sky's music (no semitones)
+        aspect = 'root'
+    elif index % cols % 2 == 0: # Note is in an odd column, so it is a circle
+        aspect = 'circle'
+    else: # Note is in an even column, so it is a diamond
+        aspect = 'diamond'
+    semitone = 12 * (index // 7) + Resources.MIDI_SEMITONES[index % 7]
+    buttons = {}
+    for layout in layouts:
+        layout_map = layout.note_parser_method.INV_COORD_MAPS.get(shape, {}).get(layout.get_nickname())
+        if layout_map: buttons[layout.get_nickname()] = layout_map.get(coord, 'X')
+    row_names = Resources.PNG_SETTINGS['row_names']
+    row_name = row_names[row] if 0 <= row < len(row_names) else str(row + 1)
+    return NoteInfo(index, coord, aspect, row_name, semitone, buttons)
+
+def get_note_table(shape):
+    '''Returns the dict {coord: NoteInfo} of an instrument shape, computed only once per shape'''
+    try:
+        return _note_tables[shape]
+    except KeyError:
+        from skymusic.modes import GamepadLayout # Imported here because modes imports instruments
+        table = {(row, col): make_note_info(shape, (row, col), GamepadLayout) for row in range(shape[0]) for col in range(shape[1])}
+        _note_tables[shape] = table
+        return table
+
 
 class Note:
 
+    __slots__ = ('coord', 'instrument', 'index', 'info')
+
     def __init__(self, instrument, coord=None):
-        self.coord = coord
         self.instrument = instrument #Instrument object owing the note
-        if coord is not None:
-            self.index = (coord[0] * instrument.get_num_columns()) + coord[1]
-        else:
-            self.index = None
+        self.set_coord(coord)
 
     def get_coord(self):
         '''Return the note coord as a tuple row/column'''
@@ -16,12 +53,29 @@ class Note:
     def set_coord(self, coord):
         '''Sets the coord tuple from row and column values'''
         self.coord = coord
-        self.index = (coord[0] * self.instrument.get_num_columns()) + coord[1]
+        if coord is None:
+            self.info = None
+            self.index = None
+        else:
+            shape = self.instrument.get_shape()
+            self.info = get_note_table(shape).get(coord) or make_note_info(shape, coord) # Coords outside the grid are not in the table
+            self.index = self.info.index
 
     def get_index(self):
         '''Returns the note index in Sky grid'''
         return self.index
 
+    def get_info(self):
+        '''Returns the NoteInfo of the note, shared by all notes at this coord in the grid'''
+        return self.info
+
+    def get_button(self, gamepad):
+        '''Returns the name of the button playing the note with the gamepad layout'''
+        try:
+            return self.info.buttons[gamepad.get_nickname()]
+        except (AttributeError, KeyError):
+            return 'X'
+
     def get_highlighted_frames(self):
         return self.instrument.get_highlighted_frames(self.get_coord())
 
@@ -34,4 +88,3 @@ class Note:
 
     def __str__(self):
         return f"<{self.index}, coord={self.coord}, highlighted frames={self.get_highlighted_frames()}>"
-
@@ -0,0 +1,77 @@
+"""A parsing session reparsing only the lines changed since the previous parse, for live editors"""
+import hashlib
+from skymusic.modes import InputMode
+from skymusic.song import Song
+
+class IncrementalSongParser:
+    """
+    Keeps the hash of each line of the last parsed text, and its line of instruments.
+    parse_song() reparses only the lines that were not in the last text, and reuses the instruments of the others.
+    The instruments of a line are reused at most once per occurrence of the line, so a Song never shares instruments
+    between two of its lines.
+    All lines are reparsed when the input mode, delimiters, instrument type, song key or octave shift change.
+    """
+    def __init__(self, song_parser):
+        self.song_parser = song_parser
+        self.settings = None
+        self.line_hashes = [] # Hash of each line of the last parsed text
+        self.instrument_lines = {} # Lines of instruments by hash, a list per occurrence of the line
+
+    def get_settings(self, song_key, octave_shift):
+        """Returns all the settings changing the result of SongParser.parse_line"""
+        song_parser = self.song_parser
+        return (song_parser.get_input_mode(), song_parser.get_instrument_type(), song_parser.get_lexer(),
+                song_parser.get_note_parser(), song_key, octave_shift)
+
+    def hash_line(self, line):
+        return hashlib.blake2b(line.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def reset(self):
+        """Forgets the last parsed text"""
+        self.settings = None
+        self.line_hashes = []
+        self.instrument_lines = {}
+
+    def parse_song(self, song_lines, song_key, octave_shift):
+        """
+        Returns a Song from the textual song in 'song_lines', and the sorted list of the indices of the lines
+        of the Song that were parsed again because they were not in the last parsed text.
+        These are indices in the lines of the Song, which has no metadata and no empty lines.
+        HTML, MIDI and JSON songs are always parsed entirely, so all their lines are returned.
+        """
+        song_parser = self.song_parser
+        if song_parser.get_input_mode() in (InputMode.SKYHTML, InputMode.MIDI, InputMode.SKYJSON):
+            self.reset()
+            song = song_parser.parse_song(song_lines, song_key, octave_shift)
+            return song, list(range(song.get_num_lines()))
+
+        settings = self.get_settings(song_key, octave_shift)
+        if settings != self.settings:
+            self.reset()
+            self.settings = settings
+
+        song_lines = song_parser.convert_song_lines(song_lines)
+        song = Song(locale=song_parser.locale, music_key=song_parser.english_note_name(song_key))
+        song_lines = song_parser.parse_song_head(song_lines, song)
+        note_shift = song_parser.get_note_parser().get_base_of_western_major_scale() * octave_shift
+
+        line_hashes = []
+        instrument_lines = {}
+        changed = []
+        for song_line in song_lines:
+            line_hash = self.hash_line(song_line)
+            previous_lines = self.instrument_lines.get(line_hash)
+            if previous_lines:
+                instrument_line = previous_lines.pop()
+            else:
+                instrument_line = song_parser.parse_line(song_line, song_key, note_shift)
+                if instrument_line: # Empty lines are not added to the Song
+                    changed.append(song.get_num_lines())
+            song.add_line(instrument_line)
+            line_hashes.append(line_hash)
+            instrument_lines.setdefault(line_hash, []).append(instrument_line)
+
+        self.line_hashes = line_hashes
+        self.instrument_lines = instrument_lines
+
+        return song, changed
@@ -0,0 +1,128 @@
+"""Tokenizer of the lines of a textual song, compiled once per delimiter configuration"""
+import re
+
+RULER = 'ruler'
+LAYER = 'layer'
+LYRICS = 'lyrics'
+ICONS = 'icons'
+
+ALLOWED_REGEX = [r'\s', '\t', r'\w', r'\d', '\n', '\r', '\a', r'\e', '\f', '\v', r'\R'] # Control characters, or regexes
+
+
+def delimiter_pattern(delimiter):
+    """Returns the regular expression matching a delimiter in split_line"""
+    if delimiter in ALLOWED_REGEX:
+        return delimiter
+    elif delimiter == '#':  # to allow HTML/CSS hex color codes
+        return r'(?<!"|\'|:|#)#'
+    elif delimiter == '%':  # to allow percentages in HTML/CSS size attributes
+        return r'%(?!"|\')'
+    else:
+        return re.escape(delimiter)
+
+
+class LineLexer:
+    """
+    Sanitizes a song line and splits it into lyrics, or icons of chords, in a single scan.
+    Use LineLexer.get() to share the lexer of a delimiter configuration: all its regular expressions are compiled once.
+    """
+    _lexers = {}
+
+    bracket_chord = re.compile(r'(?:\(|\[)((?:\w+\s*)+)(?:\)|\])')
+    blanks = re.compile(r'\s')
+    surnumerous_blanks = re.compile(r'(\s){2,}')
+    script_tags = re.compile(r'<\s*/*\s*script[^>]*>', re.I)
+
+    def __init__(self, icon_delimiter, quaver_delimiter, lyric_delimiter, repeat_indicator, metadata_delimiter,
+                 ruler_regex, layer_regex, convert_brackets=True):
+
+        self.icon_delimiter = icon_delimiter
+        self.quaver_delimiter = quaver_delimiter
+        self.lyric_delimiter = lyric_delimiter
+        self.repeat_indicator = repeat_indicator
+        self.metadata_delimiter = metadata_delimiter
+        self.convert_brackets = convert_brackets
+
+        if icon_delimiter in ALLOWED_REGEX:
+            delimiter = icon_delimiter
+        elif icon_delimiter == ' ':
+            delimiter = r'\s'
+        else:
+            delimiter = re.escape(icon_delimiter)
+        self.surnumerous_delimiters = re.compile('(' + delimiter + ')' + '{2,}')
+        self.edge_delimiters = re.compile('^' + delimiter + '|' + delimiter + '$')
+
+        icon_pattern = delimiter_pattern(icon_delimiter)
+        quaver_pattern = delimiter_pattern(quaver_delimiter)
+        self.icon_splitter = re.compile(icon_pattern)
+        self.lyric_splitter = re.compile(delimiter_pattern(lyric_delimiter))
+        self.quaver_splitter = re.compile(quaver_pattern)
+        # Icon delimiters are captured, quaver delimiters are not: icons and their chords come out of one split
+        self.chord_splitter = re.compile(f'({icon_pattern})|{quaver_pattern}')
+        self.ruler_regex = re.compile(ruler_regex)
+        self.layer_regex = re.compile(layer_regex)
+
+    @classmethod
+    def get(cls, *args):
+        """Returns the lexer for these delimiters, creating it the first time"""
+        try:
+            return cls._lexers[args]
+        except KeyError:
+            return cls._lexers.setdefault(args, cls(*args))
+
+    def _remove_blanks_(self, mo):
+        return self.blanks.sub('', mo.group(1))
+
+    def sanitize_line(self, line):
+        """
+        Converts bracket chords, replaces surnumerous blanks and delimiters,
+        removes script tags and delimiters on the edges
+        """
+        if self.convert_brackets and ('(' in line or '[' in line):
+            line = self.bracket_chord.sub(self._remove_blanks_, line)
+        line = self.surnumerous_blanks.sub('\\1', line).strip()
+        if '<' in line:
+            line = self.script_tags.sub('', line)
+        line = self.surnumerous_delimiters.sub('\\1', line)
+        return self.edge_delimiters.sub('', line)
+
+    def split_repeat(self, chord):
+        """Returns the repeat count of a chord and the chord without its repeat indicator"""
+        parts = chord.split(self.repeat_indicator, 2)
+        if len(parts) > 1:
+            try:
+                return int(parts[1]), parts[0]
+            except ValueError:
+                pass
+        return 1, chord
+
+    def split_icons(self, line):
+        """
+        Splits a sanitized line of notes into icons, and each icon into chords, in a single scan:
+        'A1C2-F3D4 B1' gives [['A1C2', 'F3D4'], ['B1']]
+        """
+        tokens = self.chord_splitter.split(line)
+        icons = [[tokens[0]]]
+        # tokens alternate between a chord and a captured icon delimiter, None for a quaver delimiter
+        for i in range(1, len(tokens), 2):
+            if tokens[i] is None:
+                icons[-1].append(tokens[i + 1])
+            else:
+                icons.append([tokens[i + 1]])
+        return icons
+
+    def tokenize(self, line):
+        """
+        Returns the kind of a sanitized line and its tokens:
+        (RULER, match), (LAYER, match), (LYRICS, [lyric,...]) or (ICONS, [[chord,...],...]).
+        Returns (None, None) for empty and metadata lines.
+        """
+        if not line or line.startswith(self.metadata_delimiter):
+            return None, None
+        mo = self.ruler_regex.match(line)
+        if mo: return RULER, mo
+        mo = self.layer_regex.match(line)
+        if mo: return LAYER, mo
+        if line[0] == self.lyric_delimiter:
+            return LYRICS, [lyric for lyric in self.lyric_splitter.split(line) if len(lyric) > 0]
+        return ICONS, self.split_icons(line)
@@ -1,8 +1,9 @@
 #import json, re
-import os
+import os, hashlib, threading
+from collections import OrderedDict
 from skymusic.resources import Resources
 from io import BytesIO
-from skymusic.parsers import music_theory
+from skymusic.parsers import music_theory, smf_reader
 from skymusic.modes import InputMode
 try:
     import mido
@@ -10,10 +11,34 @@ try:
 except (ImportError, ModuleNotFoundError):
     no_mido_module = True
 
+
+class MidiTrackStats:
+    """
+    Statistics of a MIDI track, collected in a single pass over its messages by MidiSongParser.analyze_track
+    """
+    max_onsets = 129 # Number of note onsets kept to extract the note interval
+
+    def __init__(self):
+        self.name = ''
+        self.has_notes = False # Whether the track has any message that is not a meta message
+        self.num_notes = 0 # Number of note_on messages with a non-zero velocity
+        self.lowest_pitch = 128 # Of all note_on messages, including those with a zero velocity
+        self.highest_pitch = -1
+        self.key = None # First key signature
+        self.copyright = '' # Last copyright notice
+        self.onset_times = [] # Times of the first note onsets, see MidiSongParser.analyze_track
+        self.tempos = [] # (time, tempo) of each tempo change
+
+
 class MidiSongParser:
     """
     For parsing a text format into a Song object
     """
+    # Decoded MIDI files and the statistics of their tracks, by digest of their bytes and decoder, most recently used last
+    _midi_files = OrderedDict()
+    _max_midi_files = 4
+    _midi_files_lock = threading.Lock() # The cache is shared by the parsers of all threads
+    use_mido = False # Decodes MIDI files with mido rather than smf_reader, when mido is installed
 
     def __init__(self, maker, silent_warnings=True):
         self.maker = maker
@@ -50,41 +75,49 @@ class MidiSongParser:
         except AttributeError: #Neither string or bytes, skipping
             return False
     
-    def extract_note_interval(self, track, min_interval):
-        
-        times = []
+    def analyze_track(self, track):
+        """
+        Returns the MidiTrackStats of a track, reading its messages once
+        """
+        stats = MidiTrackStats()
+        is_named = False
         t = 0
-        '''
-        for i, msg in enumerate(track):
-            try:
-                t += msg.time
-            except AttributeError:
-                pass
-            if msg.type == 'note_on':
-                t2 = 0
-                for msg2 in track[i:]:
-                    try:
-                        t2 += msg2.time
-                    except AttributeError:
-                        pass
-                    if msg2.type == 'note_off':
-                        if msg2.note == msg.note:
-                            times.append(t+t2)
-                            break
-        '''
-        i = 0
         for msg in track:
-            if i > 128:
-                break
-            if msg.type == 'note_on':
-                if msg.velocity != 0: #reject  silences
-                    times.append(t)
-                    i += 1
-            try:
-                t += msg.time
-            except AttributeError:
-                pass
-                
+            msg_type = msg.type
+            if msg.is_meta:
+                if msg_type == 'track_name' and not is_named:
+                    stats.name = msg.name
+                    is_named = True
+                elif msg_type == 'key_signature' and stats.key is None:
+                    stats.key = msg.key
+                elif msg_type == 'copyright':
+                    stats.copyright = msg.text
+                elif msg_type == 'set_tempo':
+                    stats.tempos.append((t + msg.time, msg.tempo))
+            else:
+                stats.has_notes = True
+                if msg_type == 'note_on':
+                    note = msg.note
+                    if note < stats.lowest_pitch:
+                        stats.lowest_pitch = note
+                    if msg.velocity != 0: #reject  silences
+                        stats.num_notes += 1
+                        if note > stats.highest_pitch:
+                            stats.highest_pitch = note
+                        if len(stats.onset_times) < stats.max_onsets:
+                            stats.onset_times.append(t) # Before adding the delay of the note, as always done
+            t += msg.time
+        return stats
+
+    def analyze_midi(self, midi_file):
+        """Returns the list of the MidiTrackStats of the tracks of a MidiFile"""
+        if not midi_file:
+            return []
+        return [self.analyze_track(track) for track in midi_file.tracks]
+
+    def extract_note_interval(self, track_stats, min_interval):
+        
+        times = track_stats.onset_times
         if len(times) == 0:
             return None
         
@@ -97,66 +130,50 @@ class MidiSongParser:
             
         return note_interval
     
-    def has_notes(self, track):
+    def has_notes(self, track_stats):
         
-        return any([not msg.is_meta for msg in track])
+        return track_stats.has_notes
 
-    def extract_key(self, track):
+    def extract_key(self, track_stats):
         
-        for msg in track:
-            if msg.type == 'key_signature':
-                return msg.key
-        
-        return None
+        return track_stats.key
  
-    def extract_first_key(self, midi_file):
+    def extract_first_key(self, tracks_stats):
         
-        if midi_file:
-            for track in midi_file.tracks:
-                track_key = self.extract_key(track)
-                if track_key:
-                    return track_key
+        for track_stats in tracks_stats:
+            track_key = self.extract_key(track_stats)
+            if track_key:
+                return track_key
         
         return None
 
-    def extract_copyright(self, midi_file):
+    def extract_copyright(self, tracks_stats):
         
-        copyright = ''
-        if midi_file.tracks:
-            for msg in midi_file.tracks[0]:
-                if msg.type == 'copyright':
-                    copyright = msg.text
-                    
-        return copyright
-                                         
+        return tracks_stats[0].copyright if tracks_stats else ''
                                                             
-    def extract_lowest_octave(self, track):
+    def extract_lowest_octave(self, track_stats):
         
-        lowest = 128
-        for msg in track:
-            if msg.type == 'note_on':
-                if msg.note < lowest:
-                    lowest = msg.note
-                    
-        lowest_octave = int((lowest - self.root_pitch) / 12)
+        lowest_octave = int((track_stats.lowest_pitch - self.root_pitch) / 12)
         
         return lowest_octave
 
-    def parse_track_info(self, track):
+    def parse_track_info(self, track_stats):
         
         track_info = ""
-        if track.name:
-            track_info += '## Track name: ' + track.name
+        if track_stats.name:
+            track_info += '## Track name: ' + track_stats.name
         
-        if self.has_notes(track):
-            track_key = self.extract_key(track)
+        if self.has_notes(track_stats):
+            track_key = self.extract_key(track_stats)
             if track_key:
                 track_info += ', musical key= ' + track_key
         
         return track_info
     
-    def parse_first_meta(self, midi_file):
+    def parse_first_meta(self, midi_file, tracks_stats=None):
         
+        if tracks_stats is None:
+            tracks_stats = self.analyze_midi(midi_file)
         metadata = []
         #TODO : extract copyright
         basename = ''
@@ -164,11 +181,11 @@ class MidiSongParser:
             (basename,_) = os.path.splitext(midi_file.filename)
         metadata.append(Resources.DELIMITERS['metadata'] + 'Title:' + basename.capitalize())
         
-        artist = self.extract_copyright(midi_file)
+        artist = self.extract_copyright(tracks_stats)
         metadata.append(Resources.DELIMITERS['metadata'] + 'Artist: ' + artist)
         metadata.append(Resources.DELIMITERS['metadata'] + 'Transcript writer:' + '')
         
-        first_key = self.extract_first_key(midi_file)
+        first_key = self.extract_first_key(tracks_stats)
         
         if first_key:
             metadata.append(Resources.DELIMITERS['metadata'] + 'Musical key: ' + first_key)
@@ -194,11 +211,17 @@ class MidiSongParser:
             
         return note + str(octave-base_octave+Resources.PARSING_START_OCTAVE)
     
-    def parse_notes(self, track, note_interval):
-        
-        base_octave = self.extract_lowest_octave(track)
-        
-        notes = ['']
+    def parse_notes(self, track, note_interval, as_text=True, track_stats=None):
+        """
+        Returns the notes of a track as a line of text of icons, or if as_text is False,
+        as a list of icons, each a list of chords, each a list of notes: 'C1D1-E1 .' gives [[['C1', 'D1'], ['E1']], [['.']]]
+        """
+        if track_stats is None:
+            track_stats = self.analyze_track(track)
+        base_octave = self.extract_lowest_octave(track_stats)
+        pause = Resources.DELIMITERS['pause']
+        
+        icons = [[[]]] # Starts with an empty icon
         t = 0
         prev_t = -note_interval
         prev_prev_t = prev_t
@@ -211,36 +234,44 @@ class MidiSongParser:
                 
                 dt = t - prev_t
                 
-                notes += [Resources.DELIMITERS['pause']]*int(dt/note_interval - 1) #parses implicit silences
+                icons += [[[pause]] for _ in range(int(dt/note_interval - 1))] #parses implicit silences
                 
                 note = self.parse_note_msg(msg, base_octave)
                 
-                if note == Resources.DELIMITERS['pause']:
+                if note == pause:
                     if dt > 0.5*note_interval:
-                        notes.append(note)
+                        icons.append([[note]])
                       
                 elif note:
                     
-                    if notes[-1] == Resources.DELIMITERS['pause']:
+                    if icons[-1] == [[pause]]:
                         if (t - prev_prev_t < note_interval):
-                            del(notes[-1])
-                        notes.append(note)
+                            del(icons[-1])
+                        icons.append([[note]])
                     else:
                         if dt == 0: #chord
-                            notes[-1] += note
-                        elif (dt <= 0.45*note_interval) and (notes[-1] != Resources.DELIMITERS['pause']):
-                            notes[-1] += Resources.DELIMITERS['quaver'] + note
+                            icons[-1][-1].append(note)
+                        elif (dt <= 0.45*note_interval):
+                            icons[-1].append([note]) #quaver
                         else:
-                            notes.append(note)
+                            icons.append([[note]])
                   
                 if note:
                     prev_prev_t = prev_t
                     prev_t = t
-                      
-        return self.icon_delimiter.join(filter(None,notes))
+        
+        icons = [icon for icon in icons if icon != [[]]]
+        return self.icons_to_text(icons) if as_text else icons
+
+    def icons_to_text(self, icons):
+        """Returns the line of text of a list of icons of chords of notes made by parse_notes"""
+        quaver = Resources.DELIMITERS['quaver']
+        return self.icon_delimiter.join([quaver.join([''.join(chord) for chord in icon]) for icon in icons])
 
     def sanitize_midi_lines(self, midi_lines):
         
+        if isinstance(midi_lines, (bytes, bytearray)):
+            return bytes(midi_lines)
         try:
             midi_bytes = b''.join(midi_lines)
         except TypeError:
@@ -249,13 +280,20 @@ class MidiSongParser:
         return midi_bytes                                                      
 
     def create_MidiFile(self, midi_lines):
-        
-        if no_mido_module:
-            print("\n***ERROR: MIDI could not be imported because mido module was not found.")
-            return None
-        
+        """
+        Returns the decoded MIDI file of midi_lines, or None.
+        Files are decoded by smf_reader, and by mido if use_mido is True or if smf_reader cannot read them.
+        """
         midi_bytes = self.sanitize_midi_lines(midi_lines)
         
+        if not self.use_mido or no_mido_module:
+            try:
+                return smf_reader.read_smf(midi_bytes)
+            except ValueError as err:
+                if no_mido_module:
+                    print(f"\n***ERROR: your file could not be read as MIDI ({err}).")
+                    return None
+        
         buffer = BytesIO()
         buffer.write(midi_bytes)
         buffer.seek(0)
@@ -268,17 +306,42 @@ class MidiSongParser:
         
         return mid 
 
+    def load_midi(self, midi_lines):
+        """
+        Returns the MidiFile of midi_lines and the list of the MidiTrackStats of its tracks, or (None, []).
+        They are shared by all parsers decoding the same bytes with the same decoder, so that find_key,
+        collect_notes and parse_midi decode a MIDI file only once, and they are read-only:
+        the tracks of smf_reader are tuples of immutable events, while mido files and the MidiTrackStats
+        must not be modified by callers.
+        """
+        midi_bytes = self.sanitize_midi_lines(midi_lines)
+        key = (hashlib.blake2b(midi_bytes, digest_size=16).digest(), self.use_mido)
+        midi_files = MidiSongParser._midi_files
+        with MidiSongParser._midi_files_lock:
+            if key in midi_files:
+                midi_files.move_to_end(key)
+                return midi_files[key]
+        mid = self.create_MidiFile(midi_bytes)
+        if not mid:
+            return None, []
+        loaded = (mid, self.analyze_midi(mid))
+        with MidiSongParser._midi_files_lock:
+            loaded = midi_files.setdefault(key, loaded) # Another thread may have decoded the same file meanwhile
+            while len(midi_files) > self._max_midi_files:
+                midi_files.popitem(last=False)
+        return loaded
+
     def find_key(self, midi_lines):
         
-        mid = self.create_MidiFile(midi_lines)
-        song_key = self.extract_first_key(mid)
+        (mid, tracks_stats) = self.load_midi(midi_lines)
+        song_key = self.extract_first_key(tracks_stats)
         
         return [song_key] if song_key else []
                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                
     
     def collect_notes(self, midi_lines):
         '''Only used by Music Theory'''
-        mid = self.create_MidiFile(midi_lines)
+        (mid, _) = self.load_midi(midi_lines)
         
         if mid:
             song = []
@@ -291,23 +354,25 @@ class MidiSongParser:
             
             return [self.icon_delimiter.join(song)]
                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                   
-    def parse_midi(self, midi_lines):
-        
-        if no_mido_module: return []
-        mid = self.create_MidiFile(midi_lines)
+    def parse_midi(self, midi_lines, as_text=True):
+        """
+        Returns the lines of text of a MIDI song.
+        If as_text is False, the notes of each track are a list of icons instead, see parse_notes.
+        """
+        (mid, tracks_stats) = self.load_midi(midi_lines)
         if not mid: return []
-        song = self.parse_first_meta(mid)
+        song = self.parse_first_meta(mid, tracks_stats)
         
-        for i, track in enumerate(mid.tracks):
+        for track, track_stats in zip(mid.tracks, tracks_stats):
             
-            track_info = self.parse_track_info(track)
+            track_info = self.parse_track_info(track_stats)
             
-            note_interval = self.extract_note_interval(track, 1)
+            note_interval = self.extract_note_interval(track_stats, 1)
             
             if note_interval is not None:          
-                notes = self.parse_notes(track, note_interval)
+                notes = self.parse_notes(track, note_interval, as_text, track_stats)
             else:
-                notes = ''
+                notes = '' if as_text else []
             
             if (track_info and not notes) and len(mid.tracks) > 2:
                 song += [self.layer_delimiter]
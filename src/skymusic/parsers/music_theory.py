@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
-import os, re
+import os, re, math
 from operator import truediv, itemgetter
 from collections import OrderedDict
 from skymusic.modes import InputMode
 from skymusic.parsers.html_parser import HtmlSongParser
+try:
+    import numpy as np
+    no_numpy_module = False
+except (ImportError, ModuleNotFoundError):
+    no_numpy_module = True
 
 class MusicTheory():
     """
@@ -11,16 +16,22 @@ class MusicTheory():
      so any change made to song parser may break this one.   
         
     """
+    # Krumhansl-Kessler probe-tone ratings of the 12 degrees of a major key, from the tonic
+    KRUMHANSL_MAJOR_PROFILE = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
+    # Tempo analysis uses the vectorized methods when NumPy is installed, the pure Python ones otherwise
+    use_numpy = not no_numpy_module
     
     def __init__(self, song_parser):
         
         self.song_parser = song_parser # Vital, essential! 
 
 
-    def detect_input_mode(self, song_lines):
+    def detect_input_mode(self, song_lines, min_notes=200, max_notes=None):
         """
         Attempts to detect input musical notation for the textual song in 'song_lines'.
         Returns a list with the probable input modes (eliminating the least likely)
+        Lines are read until the scores of the modes are decisive after at least min_notes notes,
+        or until max_notes notes have been read, if not None.
         """
         from skymusic.parsers import json_parser, midi_parser
         
@@ -44,69 +55,109 @@ class MusicTheory():
 
         possible_modes = [mode for mode in InputMode if mode not in [InputMode.SKYJSON, InputMode.SKYHTML, InputMode.MIDI]]
         possible_parsers = [song_parser.get_note_parser(mode) for mode in possible_modes]
-        possible_regex = [parser.single_note_name_regex for parser in possible_parsers]
+        english_idx = possible_modes.index(InputMode.ENGLISH)
+        keyboard_idx = possible_modes.index(InputMode.SKYKEYBOARD)
 
-        good_notes = [0] * len(possible_modes)
-        num_notes = [0] * len(possible_modes)
-        defg_notes = 0
-        qwrt_notes = 0
-        octave_span = 0
+        # Counts by mode, then DEFG notes, QWRT notes and octave span of English notes
+        counts = [[0] * len(possible_modes), [0] * len(possible_modes), 0, 0, 0]
+        chord_counts = {} # Counts of each distinct chord, which are computed only once
+        lexer = song_parser.get_lexer()
 
         for line in song_lines:
-            line = song_parser.sanitize_line(line)
-            if len(line) > 0:
-                if line[0] != song_parser.lyric_delimiter:
-                    icons = song_parser.split_line(line)
-                    for icon in icons:
-                        chords = song_parser.split_icon(icon)
-                        for chord in chords:
-                            for idx, possible_mode in enumerate(possible_modes):
-
-                                if 'chords' in possible_parsers[idx].__dict__.keys():
-                                    notes = [chord]  # Because abbreviated chord names are not composed of note names
-                                    good_notes[idx] += sum(
-                                        [int(note in possible_parsers[idx].chords.keys()) for note in notes])
-                                else:
-                                    _, chord = song_parser.split_repeat(chord)
-                                    notes = song_parser.split_chord(chord, possible_parsers[idx])
-                                    good_notes[idx] += sum(
-                                        [int(possible_regex[idx].match(note) is not None) for note in notes if
-                                         note != song_parser.pause])
-                                # TODO: use self.map_note_to_position?
-
-                                num_notes[idx] += sum([1 for note in notes if note != song_parser.pause])
-
-                                if possible_mode == InputMode.ENGLISH:
-                                    defg_notes += sum([int(re.search('[D-Gd-g]', note) is not None) for note in notes])
-                                    qwrt_notes += sum(
-                                        [int(re.search('[QWRTSZXVqwrtszxv]', note) is not None) for note in notes])
-                                    octaves = [re.search('\d', note) for note in notes]
-
-                                    octaves = sorted([int(octave.group(0)) for octave in octaves if octave is not None])
-                                    if len(octaves) > 0:
-                                        octave_span = max(octave_span, octaves[-1] - octaves[0] + 1)
+            line = lexer.sanitize_line(line)
+            if len(line) == 0 or line[0] == song_parser.lyric_delimiter:
+                continue
+            for icon in lexer.split_icons(line):
+                for chord in icon:
+                    try:
+                        (good_notes, num_notes, defg_notes, qwrt_notes, octave_span) = chord_counts[chord]
+                    except KeyError:
+                        chord_counts[chord] = self.count_chord_notes(chord, possible_modes, possible_parsers)
+                        (good_notes, num_notes, defg_notes, qwrt_notes, octave_span) = chord_counts[chord]
+                    for idx in range(len(possible_modes)):
+                        counts[0][idx] += good_notes[idx]
+                        counts[1][idx] += num_notes[idx]
+                    counts[2] += defg_notes
+                    counts[3] += qwrt_notes
+                    counts[4] = max(counts[4], octave_span)
+            # Stops when enough notes have been read
+            sample_size = max(counts[1])
+            if (max_notes is not None and sample_size >= max_notes) or (
+                    sample_size >= min_notes and self.is_decisive(self.score_input_modes(counts, english_idx, keyboard_idx), sample_size)):
+                break
+
+        scores = self.score_input_modes(counts, english_idx, keyboard_idx)
+        return self.most_likely(scores, possible_modes, 0.9)
 
+
+    def count_chord_notes(self, chord, possible_modes, possible_parsers):
+        """
+        Returns the numbers of valid notes and of notes in 'chord' for each of possible_modes,
+        and the number of DEFG notes, QWRT notes and the octave span of the chord read as English notes
+        """
+        song_parser = self.song_parser
+        good_notes = [0] * len(possible_parsers)
+        num_notes = [0] * len(possible_parsers)
+        defg_notes = qwrt_notes = octave_span = 0
+
+        for idx, (possible_mode, parser) in enumerate(zip(possible_modes, possible_parsers)):
+            if 'chords' in parser.__dict__.keys():
+                notes = [chord]  # Because abbreviated chord names are not composed of note names
+                good_notes[idx] += sum([int(note in parser.chords.keys()) for note in notes])
+            else:
+                _, chord = song_parser.split_repeat(chord)
+                notes = song_parser.split_chord(chord, parser)
+                good_notes[idx] += sum([int(parser.single_note_name_regex.match(note) is not None) for note in notes if
+                                        note != song_parser.pause])
+            # TODO: use self.map_note_to_position?
+
+            num_notes[idx] += sum([1 for note in notes if note != song_parser.pause])
+
+            if possible_mode == InputMode.ENGLISH:
+                defg_notes += sum([int(re.search('[D-Gd-g]', note) is not None) for note in notes])
+                qwrt_notes += sum([int(re.search('[QWRTSZXVqwrtszxv]', note) is not None) for note in notes])
+                octaves = sorted([int(octave.group(0)) for octave in (re.search(r'\d', note) for note in notes) if octave is not None])
+                if len(octaves) > 0:
+                    octave_span = octaves[-1] - octaves[0] + 1
+
+        return (good_notes, num_notes, defg_notes, qwrt_notes, octave_span)
+
+
+    def score_input_modes(self, counts, english_idx, keyboard_idx):
+        """Returns the score of each input mode from the counts of detect_input_mode"""
+        (good_notes, num_notes, defg_notes, qwrt_notes, octave_span) = counts
         num_notes = [1 if x == 0 else x for x in num_notes]  # Removes zeros to avoid division by zero
 
         scores = list(map(truediv, good_notes, num_notes))
-        defg_notes /= num_notes[possible_modes.index(InputMode.ENGLISH)]
-        qwrt_notes /= num_notes[possible_modes.index(InputMode.SKYKEYBOARD)]
+        defg_notes /= num_notes[english_idx]
+        qwrt_notes /= num_notes[keyboard_idx]
 
         if ((defg_notes == 0) or (defg_notes < 0.01 and octave_span > 2)) and (
-                num_notes[possible_modes.index(InputMode.ENGLISH)] > 10):
-            scores[possible_modes.index(InputMode.ENGLISH)] *= 0.5
+                num_notes[english_idx] > 10):
+            scores[english_idx] *= 0.5
 
         if ((qwrt_notes == 0) or (qwrt_notes < 0.01 and octave_span <= 1)) and (
-                num_notes[possible_modes.index(InputMode.SKYKEYBOARD)] > 5):
-            scores[possible_modes.index(InputMode.SKYKEYBOARD)] *= 0.5
-        
-        return self.most_likely(scores, possible_modes, 0.9)
+                num_notes[keyboard_idx] > 5):
+            scores[keyboard_idx] *= 0.5
 
+        return scores
 
-    def find_key(self, song_lines):
+
+    def is_decisive(self, scores, sample_size):
+        """
+        Returns True if the best score leads the others by more than 3 standard errors of the difference,
+        for a sample of sample_size notes, so that reading more notes would not change the detected mode
+        """
+        (best, second) = sorted(scores, reverse=True)[:2]
+        standard_error = math.sqrt((best*(1-best) + second*(1-second))/sample_size)
+        return best - second > 3*standard_error + 0.1
+
+
+    def find_key(self, song_lines, profile=None):
         """
         Attempts to find the musical key for the textual song in 'input_lines'.
         Requires knoledge of the musical notation (input_mode) first.
+        See rank_keys for the optional key profile.
         """
         from skymusic.parsers import midi_parser
         
@@ -124,48 +175,141 @@ class MusicTheory():
                 if not song_lines:
                     return None
         
+        ranked_keys = self.rank_keys(song_lines, profile)
+        if ranked_keys is None:
+            return None
+        (possible_keys, scores) = zip(*ranked_keys)
+
+        return self.most_likely(list(scores), list(possible_keys), 0.9)
+
+
+    def build_pitch_histogram(self, song_lines):
+        """
+        Counts the notes of the textual song in 'song_lines' in one pass, without raising any exception.
+        Returns a list of the numbers of notes without octave by chromatic position, a dict of the numbers of notes
+        with octave by (chromatic position, octave), and the number of notes that are not in the chromatic scale.
+        Wrongly formatted notes are ignored.
+        """
         song_parser = self.song_parser
         note_parser = song_parser.get_note_parser()
         is_note_regex = note_parser.note_name_regex
         not_note_regex = note_parser.not_note_name_regex
+        chromatic_dict = note_parser.get_chromatic_scale()
 
-        try:           
+        pitch_classes = [0] * note_parser.get_chromatic_scale_count()
+        pitches = {}
+        num_unknown = 0
+        note_pitches = {} # Pitch of each distinct note, which is computed only once
+        for line in song_lines:
+            if len(line) > 0:
+                if line[0] != song_parser.lyric_delimiter:
+                    notes = is_note_regex.sub(' \\1',
+                                              not_note_regex.sub('', line)).split()  # Clean-up, adds space and split
+                    for note in notes:
+                        try:
+                            pitch = note_pitches[note]
+                        except KeyError:
+                            pitch = note_pitches.setdefault(note, self.get_pitch(note, note_parser, chromatic_dict))
+                        if pitch is None:  # Wrongly formatted notes are ignored
+                            continue
+                        (chromatic_position, octave) = pitch
+                        if chromatic_position is None:
+                            num_unknown += 1
+                        elif octave is None:
+                            pitch_classes[chromatic_position] += 1
+                        else:
+                            pitches[pitch] = pitches.get(pitch, 0) + 1
+
+        return pitch_classes, pitches, num_unknown
+
+
+    def get_pitch(self, note, note_parser, chromatic_dict):
+        """
+        Returns the chromatic position and octave of a note, like NoteParser.calculate_coordinate_for_note does:
+        the octave is None for a note without octave, the chromatic position is None for a note that is not
+        in the chromatic scale, and None is returned instead of a SyntaxError for a wrongly formatted note.
+        """
+        if note_parser.is_valid_note_name_with_octave(note):
+            (note_name, octave) = (note_parser.get_note_name(note), note_parser.get_note_octave(note))
+        elif note_parser.is_valid_note_name(note):
+            (note_name, octave) = (note, None)
+        else:
+            return None
+        if not note_parser.is_valid_note_name(note_name):
+            return None
+        return chromatic_dict.get(note_parser.sanitize_note_name(note_name)), octave
+
+
+    def rank_keys(self, song_lines, profile=None):
+        """
+        Ranks the possible keys of the textual song in 'song_lines', from a histogram of its notes built in one pass.
+        Returns a list of (key, score) by decreasing scores, or None for notations without a chromatic scale.
+        Without profile, the score of a key is the fraction of notes in its major scale that can be played
+        on the instrument, as with NoteParser.calculate_coordinate_for_note.
+        With a profile, such as KRUMHANSL_MAJOR_PROFILE, the score is the correlation between the profile
+        and the distribution of the notes by degree in the key.
+        """
+        note_parser = self.song_parser.get_note_parser()
+        try:
             chromatic_dict = note_parser.get_chromatic_scale()
             if not chromatic_dict:
                 return None #When case note_parser is undefined, default chromatic_dict is empty
         except AttributeError:
             # Parsers not having a chromatic scale keys should return None, eg Sky and Skykeyboard
-            return None       
+            return None
 
         # Removing synonyms
         inv_dict = OrderedDict({v: k for k, v in reversed(OrderedDict(chromatic_dict).items())})
         possible_keys = list(reversed(inv_dict.values()))
-        
-        scores = [0] * len(possible_keys)
-        num_notes = [0] * len(possible_keys)
-        for line in song_lines:
-            if len(line) > 0:
-                if line[0] != song_parser.lyric_delimiter:
-                    notes = is_note_regex.sub(' \\1',
-                                              not_note_regex.sub('', line)).split()  # Clean-up, adds space and split
-                    for i, k in enumerate(possible_keys):
-                        for note in notes:
-                            num_notes[i] += 1
-                            try:
-                                # TODO: Support for Jianpu which uses a different octave indexing system
-                                note_parser.calculate_coordinate_for_note(note, k, note_shift=0,
-                                                                               is_finding_key=True)
-                            except KeyError:
-                                scores[i] += 1
-                            except SyntaxError:  # Wrongly formatted notes are ignored
-                                num_notes[i] -= 1
-
-        num_notes = [1 if x == 0 else x for x in num_notes]
-        # Removes zeros to avoid division by zero
-        scores = list(map(truediv, scores, num_notes))
-        scores = [(1 - score) for score in scores]
-
-        return self.most_likely(scores, possible_keys, 0.9)
+
+        (pitch_classes, pitches, num_unknown) = self.build_pitch_histogram(song_lines)
+        if profile is None:
+            scores = [self.score_key(chromatic_dict[key], pitch_classes, pitches, num_unknown, note_parser)
+                      for key in possible_keys]
+        else:
+            # Counts all the notes by chromatic position, whatever their octave
+            pitch_classes = pitch_classes.copy()
+            for (chromatic_position, _), num in pitches.items():
+                pitch_classes[chromatic_position] += num
+            scores = [self.correlate(profile, pitch_classes[chromatic_dict[key]:] + pitch_classes[:chromatic_dict[key]])
+                      for key in possible_keys]
+
+        return sorted(zip(possible_keys, scores), key=itemgetter(1), reverse=True)
+
+
+    def score_key(self, key_position, pitch_classes, pitches, num_unknown, note_parser):
+        """
+        Returns the fraction of notes in the major scale of the key at key_position
+        and in the range of the instrument for the notes with an octave, 1 if there is no note
+        """
+        major_scale = note_parser.get_semitone_interval_to_major_scale_interval()
+        num_pitches = note_parser.get_chromatic_scale_count()
+        base = note_parser.get_base_of_western_major_scale()
+        num_buttons = note_parser.get_num_rows() * note_parser.get_num_columns()
+        start_octave = note_parser.get_default_starting_octave()
+
+        # Notes without octave are always placed in the range of the instrument
+        num_good = sum([pitch_classes[(key_position + interval) % num_pitches] for interval in major_scale])
+        for (chromatic_position, octave), num in pitches.items():
+            interval = chromatic_position - key_position
+            if interval < 0:
+                interval += num_pitches
+                octave -= 1
+            if interval in major_scale and octave >= 0:
+                if 0 <= base * (octave - start_octave) + major_scale[interval] < num_buttons:
+                    num_good += num
+
+        num_notes = sum(pitch_classes) + sum(pitches.values()) + num_unknown
+        return 1 - (num_notes - num_good) / max(1, num_notes)
+
+
+    def correlate(self, profile, counts):
+        """Returns the Pearson correlation between two lists of numbers, 0 if one of them is constant"""
+        mean_x = sum(profile) / len(profile)
+        mean_y = sum(counts) / len(counts)
+        covariance = sum([(x - mean_x) * (y - mean_y) for (x, y) in zip(profile, counts)])
+        norm = math.sqrt(sum([(x - mean_x) ** 2 for x in profile]) * sum([(y - mean_y) ** 2 for y in counts]))
+        return covariance / norm if norm else 0
 
 
     def most_likely(self, scores, items, threshold=0.9):
@@ -203,6 +347,10 @@ class MusicTheory():
     
     
     def spectrum(self, x, y):
+        if self.use_numpy:
+            (f, sp) = self.spectrum_numpy(x, y)
+            return f.tolist(), sp.tolist()
+
         import cmath
         from math import log, ceil
         
@@ -233,6 +381,8 @@ class MusicTheory():
 
 
     def find_peaks(self, x, y, threshold, max_peaks=3, x_bounds = ()):
+        if self.use_numpy:
+            return self.find_peaks_numpy(x, y, threshold, max_peaks, x_bounds)
                 
         def find_barycenter(t, z, i0, di):
             while len(t) < 2*di+1:
@@ -305,6 +455,8 @@ class MusicTheory():
 
     
     def analyze_tempo(self, times, chord_delay, method='diff'):
+        if self.use_numpy:
+            return self.analyze_tempo_numpy(times, chord_delay, method)
         
         def build_histogram(vals, hbin):
             num_slots = 2 + int(max(vals) / hbin)
@@ -349,3 +501,115 @@ class MusicTheory():
         
         return typ_taus
 
+
+    def spectrum_numpy(self, x, y):
+        """Same as spectrum, with the real FFT of NumPy. Returns arrays."""
+        from math import log, ceil
+
+        n1 = len(y)
+        m = ceil(log(n1)/log(2))
+        n2 = 2**m #Zero padding to a power of 2 length
+        ffty = np.fft.rfft(np.asarray(y, dtype=float), n2)
+        dx = x[2] - x[1]
+        f = np.arange(int(n2/2))/(dx*n2)
+        sp = np.abs(ffty[:int(n2/2)])**2
+        return f, sp
+
+
+    def find_peaks_numpy(self, x, y, threshold, max_peaks=3, x_bounds = ()):
+        """Same as find_peaks, with vectorized bounds and barycenters"""
+
+        def find_barycenter(t, z, i0, di):
+            di = min(di, (len(t) - 1)//2)
+            if di < 0:
+                return None
+
+            dt = t[1] - t[0]
+            tmin = t[0]
+            nmax = 10 #max number of iterations to find barycenter
+
+            n = 0
+            iG = i0
+            iG_old = iG - 2 #to enter the loop once
+            while (iG-iG_old) > 1 and n < nmax:
+                i1 = max([0,iG-di])
+                i2 = min([len(t),iG+di])
+                z_band = z[i1:i2+1]
+                iG_old = iG
+                tG = float(np.dot(t[i1:i2+1], z_band)/max(1,z_band.sum()))
+                iG = round((tG - tmin)/dt)
+                n += 1
+            return (i1, i2), tG
+
+        def bounds_indices(array, bounds):
+            (i1, i2) = (None, None)
+            if bounds:
+                if bounds[1] > bounds[0]:
+                    (lower, upper) = (array >= bounds[0], array <= bounds[1])
+                else:
+                    (lower, upper) = (array <= bounds[0], array >= bounds[1])
+                if lower.any():
+                    i1 = int(np.argmax(lower))
+                if upper.any():
+                    i2 = len(array) - 1 - int(np.argmax(upper[::-1]))
+
+            i1 = i1 if i1 else 0
+            i2 = i2 if i2 else len(array)-1
+            return (i1, i2)
+
+        div_resol = 3 #precision increase
+        peaks = list() #list of (t,h) tuples
+        x = np.asarray(x, dtype=float)
+        (i1, i2) = bounds_indices(x, x_bounds)
+
+        x2 = x[i1:i2+1]
+        y2 = np.array(y[i1:i2+1], dtype=float)
+
+        absolute_max = y2.max()
+        for i in range(max_peaks):
+            i0 = int(np.argmax(y2))
+            y0 = y2[i0]
+            if (y0 < absolute_max*threshold) or (y0==0):
+                break
+            (i1, i2), tG = find_barycenter(x2, y2, i0, div_resol)
+            peaks.append((tG, y0))
+            y2[i1:i2+1] = 0 #peak deletion
+
+        return [delay for (delay, occ) in peaks]
+
+
+    def analyze_tempo_numpy(self, times, chord_delay, method='diff'):
+        """Same as analyze_tempo, with histograms built by numpy.bincount"""
+
+        def build_histogram(vals, hbin):
+            num_slots = 2 + int(vals.max() / hbin)
+            # histogram starting at t=0, wrapping negative indices around like a list does
+            h = np.bincount((1 + (vals / hbin).astype(int)) % num_slots, minlength=num_slots)
+            t = np.arange(num_slots) * hbin #delays
+            return (t, h)
+
+        if len(times) <= 1:
+            return []
+
+        tbin = 1
+        times = np.asarray(times, dtype=float)
+
+        # Typical spacing between two consecutive notes
+        (dt, dh) = build_histogram(np.diff(times), tbin)
+
+        typ_diffs = self.find_peaks_numpy(dt, dh, 1/10, 3)
+        typ_diffs = [diff for diff in typ_diffs if diff > 2*tbin]
+
+        if method == 'diff':
+            return typ_diffs
+
+        # Notes strokes versus time
+        (t, h) = build_histogram(times[:128], tbin)
+        f, sp = self.spectrum_numpy(t, h)
+        f0 = f[1]/2
+        taus = 1/np.maximum(f, f0)
+
+        min_tau = min(typ_diffs)-tbin # to exclude quavers and quasi-chords
+        max_tau = taus[1] # to exclude the zero-frequency component
+
+        return self.find_peaks_numpy(taus, sp, 1/5, 3, (max_tau, min_tau))
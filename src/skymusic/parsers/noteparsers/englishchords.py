@@ -44,7 +44,7 @@ class EnglishChords(english.English):
             'A7sus': f"A{x}D{y}E{y}G{y}"
         }
         # use EnglishNoteParser as a helper parser for the individual notes
-        self.helper_parser = english.English()
+        self.helper_parser = english.English.get_shared()
 
     def decode_chord(self, chord):
         """
@@ -60,7 +60,7 @@ class EnglishChords(english.English):
         chord = chord.lower().capitalize()
         return chord
 
-    def calculate_coordinate_for_note(self, note, song_key='C', note_shift=0, is_finding_key=False):
+    def try_calculate_coordinate_for_note(self, note, song_key='C', note_shift=0, is_finding_key=False):
 
-        return self.helper_parser.calculate_coordinate_for_note(note, song_key, note_shift, is_finding_key)
+        return self.helper_parser.try_calculate_coordinate_for_note(note, song_key, note_shift, is_finding_key)
         
@@ -0,0 +1,55 @@
+"""Splits glued chords into notes with a trie of note names"""
+
+class NoteTokenizer:
+    """
+    A trie of all the note names of a notation, splitting a chord like 'A1C#2Eb' into ['A1', 'C#2', 'Eb'] in one scan.
+    Each note starts with the longest note name found at this position, and ends where the next note name starts,
+    like with NoteParser.note_name_regex.sub(' \\1', chord).split()
+    Use NoteTokenizer.get() to share the tokenizer of a set of note names.
+    """
+    _tokenizers = {}
+    _end = None # Key of the trie nodes marking the end of a note name
+
+    def __init__(self, note_names):
+        self.trie = {}
+        for note_name in note_names:
+            node = self.trie
+            for char in note_name:
+                node = node.setdefault(char, {})
+            node[self._end] = note_name
+
+    @classmethod
+    def get(cls, note_names):
+        """Returns the tokenizer of these note names, creating it the first time"""
+        key = frozenset(note_names)
+        try:
+            return cls._tokenizers[key]
+        except KeyError:
+            return cls._tokenizers.setdefault(key, cls(key))
+
+    def split(self, chord):
+        """Returns the list of notes of a chord, and of the text before the first note if any, without blanks"""
+        trie = self.trie
+        notes = []
+        length = len(chord)
+        start = pos = 0 # start of the current note, position of the scan
+        while pos < length:
+            node = trie.get(chord[pos])
+            if node is None:
+                pos += 1
+                continue
+            end = pos + 1 if self._end in node else pos # end of the longest note name starting at pos
+            i = pos + 1
+            while i < length:
+                node = node.get(chord[i])
+                if node is None: break
+                i += 1
+                if self._end in node: end = i
+            if end == pos: # Only a prefix of a note name
+                pos += 1
+                continue
+            if pos > start: notes += chord[start:pos].split()
+            start = pos
+            pos = end
+        notes += chord[start:].split()
+        return notes
@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
 import math
 from skymusic.resources import Resources 
+from skymusic.parsers.noteparsers.note_tokenizer import NoteTokenizer
+
+# Status codes of NoteParser.try_calculate_coordinate_for_note
+COORDINATE_OK = 0
+UNKNOWN_NOTE = 1 # Not in the chromatic scale, or not in the notes of the instrument
+NOT_IN_KEY = 2
+OUT_OF_RANGE = 3
+MALFORMED_NOTE = 4
 
 class NoteParser:
     """
@@ -27,6 +35,18 @@ class NoteParser:
     # Number of notes in the chromatic scale, and number of notes in a major scale
     CHROMATIC_SCALE_COUNT = 12
     BASE_OF_MAJOR_SCALE = 7
+    ACCIDENTALS = ['b', '#', '♭', '♯']
+
+    # Exception raised by calculate_coordinate_for_note for each status code of try_calculate_coordinate_for_note
+    COORDINATE_ERRORS = {
+        UNKNOWN_NOTE: (KeyError, "Note {note} was not found in the chromatic scale."),
+        NOT_IN_KEY: (KeyError, "Note {note} is not in the song key."),
+        OUT_OF_RANGE: (KeyError, "Note {note} is not in range of the two octaves of the Sky piano: {coordinate}"),
+        MALFORMED_NOTE: (SyntaxError, "Note {note} was not formatted correctly.")
+        }
+
+    _shared_parsers = {} # Parsers shared by the whole process, by class, locale, shape, start octave and layout
+    _max_coordinates = 4096 # Size of the lookup table of try_get_coordinate_for_note
 
     def __init__(self, locale='en_US', start_octave=Resources.PARSING_START_OCTAVE, shape=(3,5)):
 
@@ -36,6 +56,27 @@ class NoteParser:
         # Specify the default starting octave of the harp, for instance 1 (C1 D1 E1 etc.), or 4 (C4 D4 E4).
         #Octave-less notes will be assigned to this octave, e.g. F == F1
         self.default_starting_octave = start_octave
+        # Lookup table of try_get_coordinate_for_note: coordinate of valid note tokens, by token, key and shift
+        self.coordinates = {}
+        self.note_tokenizer = None
+        self.shared = False # Shared parsers cannot be modified, see get_shared
+
+    @classmethod
+    def get_shared(cls, locale=None, shape=None, start_octave=None, layout=None):
+        """
+        Returns the parser of this class shared by the whole process for these settings, creating it the first time.
+        Shared parsers are read-only, their set_shape raises TypeError: use get_shared with another shape,
+        or the constructor to get a parser whose shape can be changed.
+        """
+        key = (cls, locale, shape, start_octave, layout)
+        try:
+            return cls._shared_parsers[key]
+        except KeyError:
+            kwargs = {'locale': locale, 'shape': shape, 'start_octave': start_octave, 'layout': layout}
+            # Settings not given are left to the defaults of the constructor
+            parser = cls(**{k: v for k, v in kwargs.items() if v is not None})
+            parser.shared = True
+            return cls._shared_parsers.setdefault(key, parser)
 
     def get_num_columns(self): return self.shape[1]
 
@@ -43,7 +84,10 @@ class NoteParser:
 
     def get_shape(self): return self.shape
 
-    def set_shape(self, shape=(3,5)): self.shape = shape if shape else (3,5)
+    def set_shape(self, shape=(3,5)):
+        if self.shared:
+            raise TypeError("Cannot change the shape of a shared NoteParser: use get_shared with this shape")
+        self.shape = shape if shape else (3,5)
 
     def get_chromatic_scale(self): return self.CHROMATIC_SCALE
 
@@ -64,6 +108,44 @@ class NoteParser:
 
     def get_note_octave_regex(self): return self.note_octave_regex
 
+    def get_note_names(self):
+        """
+        Returns all the note names matched by note_name_regex, generated from the note names of CHROMATIC_SCALE:
+        each character of a note name can be any character found at the same position in other note names,
+        in lower or upper case, and the note name can be followed by an accidental.
+        Returns None for notations without a chromatic scale.
+        """
+        try:
+            scale = self.get_chromatic_scale()
+        except AttributeError:
+            return None
+        base_names = {name[:-1] if len(name) > 1 and name[-1] in self.ACCIDENTALS else name for name in scale}
+        min_length = min(len(name) for name in base_names)
+        chars = [set() for _ in range(max(len(name) for name in base_names))]
+        for name in base_names:
+            for pos, char in enumerate(name): chars[pos].update((char.lower(), char.upper()))
+        names = []
+        prefixes = ['']
+        for pos in range(len(chars)):
+            prefixes = [prefix + char for prefix in prefixes for char in chars[pos]]
+            if pos + 1 >= min_length: names += prefixes
+        return [name + accidental for name in names for accidental in [''] + self.ACCIDENTALS]
+
+    def get_note_tokenizer(self):
+        if self.note_tokenizer is None:
+            note_names = self.get_note_names()
+            if note_names is not None: self.note_tokenizer = NoteTokenizer.get(note_names)
+        return self.note_tokenizer
+
+    def split_chord(self, chord):
+        """
+        Splits a chord of glued notes into a list of notes: 'A1C2' gives ['A1', 'C2']
+        """
+        note_tokenizer = self.get_note_tokenizer()
+        if note_tokenizer is None:
+            return self.note_name_regex.sub(' \\1', chord).split()
+        return note_tokenizer.split(chord)
+
     def get_note_name(self, note):
 
         note_regexobj = self.get_note_name_regex().search(note)
@@ -147,62 +229,63 @@ class NoteParser:
         note is a string (not a Note object)
         When is_finding_key is True, the handle_note_name_without_octave method should be used
         """
+        parsed_note = self.try_parse_note(note, song_key, is_finding_key)
+        if parsed_note is None:
+            # Raise error, not a valid note
+            raise SyntaxError(f"Note {note} was not formatted correctly.")
+        return parsed_note
 
+    def try_parse_note(self, note, song_key, is_finding_key=False):
+        """
+        Same as parse_note, without raising any exception: returns None if the note is not formatted correctly
+        """
         if self.is_valid_note_name_with_octave(note):
-            note_name = self.get_note_name(note)
-            note_octave = self.get_note_octave(note)
-            return note_name, note_octave
-        else:
-            if self.is_valid_note_name(note):
-
-                # Player has given note name without specifying an octave
-                note_name = note
-
-                if not is_finding_key:
-
-                    note_octave = self.get_default_starting_octave()
-                    return note_name, note_octave
-                else:
-                    return self.handle_note_name_without_octave(note_name, song_key)
-
-            else:
-                # Raise error, not a valid note
-                raise SyntaxError(f"Note {note} was not formatted correctly.")
+            return self.get_note_name(note), self.get_note_octave(note)
+        elif not self.is_valid_note_name(note):
+            return None
+        # Player has given note name without specifying an octave
+        if is_finding_key:
+            return self.handle_note_name_without_octave(note, song_key)
+        return note, self.get_default_starting_octave()
 
     def handle_note_name_without_octave(self, note_name, song_key):
 
         """
         Handle notes specified without octaves (e.g. the note G in the key of Ab)
+        An invalid song key is taken as C, and an unknown note is left in the default octave.
         """
 
         note_octave = self.get_default_starting_octave()
 
-        chromatic_interval = self.convert_note_name_into_chromatic_position(
-            note_name) - self.convert_note_name_into_chromatic_position(song_key)
-
-        if chromatic_interval < 0:
+        note_position = self.get_chromatic_position(note_name)
+        key_position = self.get_chromatic_position(song_key) if song_key else None
+        if note_position is not None and note_position - (key_position or 0) < 0:
             note_octave += 1
 
         return note_name, note_octave
 
+    def get_chromatic_position(self, note_name):
+        """
+        Returns the numeric equivalent of the note in the chromatic scale, or None if it is malformed or unknown
+        """
+        if not self.is_valid_note_name(note_name):
+            return None
+        return self.get_chromatic_scale().get(self.sanitize_note_name(note_name))
+
     def convert_note_name_into_chromatic_position(self, note_name):
 
         """
         Returns the numeric equivalent of the note in the chromatic scale
         """
 
-        if self.is_valid_note_name(note_name):
-            note_name = self.sanitize_note_name(note_name)
-        else:
+        if not self.is_valid_note_name(note_name):
             # Error: note is not formatted right, output broken harp
             raise SyntaxError(f"ParsingError: Note {note_name} was not formatted correctly.")
 
-        chromatic_scale = self.get_chromatic_scale()
-
-        if note_name in chromatic_scale.keys():
-            return chromatic_scale[note_name]
-        else:
+        chromatic_position = self.get_chromatic_position(note_name)
+        if chromatic_position is None:
             raise KeyError(f"ParsingError: Note {note_name} was not found in the chromatic scale.")
+        return chromatic_position
 
     def convert_chromatic_position_into_note_name(self, chromatic_position):
         
@@ -242,27 +325,41 @@ class NoteParser:
         - note is not formatted correctly
 
         KeyError and SyntaxError can be caught, by any method that calls this one, to output a broken harp
+        Use try_calculate_coordinate_for_note to get a status code instead of an exception.
+        """
+        coordinate, status = self.try_calculate_coordinate_for_note(note, song_key, note_shift, is_finding_key)
+        if status != COORDINATE_OK:
+            raise self.coordinate_error(note, coordinate, status)
+        return coordinate
+
+    def try_calculate_coordinate_for_note(self, note, song_key=Resources.DEFAULT_KEY, note_shift=0, is_finding_key=False):
+
         """
+        Same as calculate_coordinate_for_note, without raising any exception.
+        Returns a tuple (coordinate, status), where status is COORDINATE_OK, UNKNOWN_NOTE, NOT_IN_KEY, OUT_OF_RANGE
+        or MALFORMED_NOTE. The coordinate is None for an unknown note, a note not in key and a malformed note.
+        """
+
+        if song_key is None:
+            song_key = Resources.DEFAULT_KEY
 
         # Convert note to base 7
-        note_name, note_octave = self.parse_note(note, song_key, is_finding_key)
+        parsed_note = self.try_parse_note(note, song_key, is_finding_key)
+        if parsed_note is None:
+            return None, MALFORMED_NOTE
+        (note_name, note_octave) = parsed_note
 
         # Find the major scale interval from the song_key to the note_name
         # Find the semitone interval from the song_key to the note_name first
-        if song_key is None:
-            song_key = Resources.DEFAULT_KEY
-        try:
-            song_key_chromatic_equivalent = self.convert_note_name_into_chromatic_position(song_key)
-        except (KeyError, SyntaxError):
-            # default to C major
-            song_key_chromatic_equivalent = 0
-        try:
-            note_name_chromatic_equivalent = self.convert_note_name_into_chromatic_position(note_name)
-        except KeyError:
+        # default to C major
+        song_key_chromatic_equivalent = self.get_chromatic_position(song_key) or 0
+
+        if note_name is None or not self.is_valid_note_name(note_name):
+            return None, MALFORMED_NOTE
+        note_name_chromatic_equivalent = self.get_chromatic_position(note_name)
+        if note_name_chromatic_equivalent is None:
             # will output broken harp
-            raise KeyError(f"Note {note_name} was not found in the chromatic scale.")
-        except SyntaxError:
-            raise SyntaxError(f"Note {note_name} was not formatted correctly.")
+            return None, UNKNOWN_NOTE
 
         interval_in_semitones = note_name_chromatic_equivalent - song_key_chromatic_equivalent
         if interval_in_semitones < 0:
@@ -272,11 +369,10 @@ class NoteParser:
 
         note_octave_str = self.convert_base_10_to_base_7(note_octave)
 
-        try:
-            major_scale_interval = self.convert_semitone_interval_to_major_scale_interval(interval_in_semitones)
-        except KeyError:
+        major_scale_interval = self.get_semitone_interval_to_major_scale_interval().get(interval_in_semitones)
+        if major_scale_interval is None:
             # Turn note into a broken harp, since note is not in the song_key
-            raise KeyError(f"Note {note} is not in the song key.")
+            return None, NOT_IN_KEY
 
         # Convert note to base 10 for arithmetic
         note_in_base_10 = self.convert_base_7_to_base_10(note_octave_str + str(major_scale_interval))
@@ -289,11 +385,44 @@ class NoteParser:
         note_coordinate = self.convert_base_10_to_coordinate_of_another_base(note_in_base_10, self.get_num_columns())
 
         if self.is_coordinate_in_range(note_coordinate):
-            return note_coordinate
+            return note_coordinate, COORDINATE_OK
         else:
             # Coordinate is not in range of the two octaves of the Sky piano
-            raise KeyError(f"Note {note} is not in range of the two octaves of the Sky piano: {note_coordinate}")
-            # TODO: define custom errors
+            return note_coordinate, OUT_OF_RANGE
+
+    def coordinate_error(self, note, coordinate, status):
+        """Returns the exception corresponding to a status code of try_calculate_coordinate_for_note"""
+        (error_class, message) = self.COORDINATE_ERRORS[status]
+        return error_class(message.format(note=note, coordinate=coordinate))
+
+    def get_coordinate_for_note(self, note, song_key=Resources.DEFAULT_KEY, note_shift=0, is_finding_key=False):
+
+        """
+        Same as calculate_coordinate_for_note, but each distinct note token is calculated only once
+        for a given song_key, note_shift and shape
+        """
+        coordinate, status = self.try_get_coordinate_for_note(note, song_key, note_shift, is_finding_key)
+        if status != COORDINATE_OK:
+            raise self.coordinate_error(note, coordinate, status)
+        return coordinate
+
+    def try_get_coordinate_for_note(self, note, song_key=Resources.DEFAULT_KEY, note_shift=0, is_finding_key=False):
+
+        """
+        Same as try_calculate_coordinate_for_note, but each distinct valid note token is calculated only once
+        for a given song_key, note_shift and shape: the coordinates are stored in self.coordinates.
+        The table keeps the last _max_coordinates tokens, as shared parsers live as long as the process.
+        """
+        table_key = (note, song_key, note_shift, is_finding_key, self.shape)
+        try:
+            return self.coordinates[table_key], COORDINATE_OK
+        except KeyError:
+            (coordinate, status) = self.try_calculate_coordinate_for_note(note, song_key, note_shift, is_finding_key)
+            if status == COORDINATE_OK: # Invalid tokens are not stored, since they can be anything
+                if len(self.coordinates) >= self._max_coordinates:
+                    del self.coordinates[next(iter(self.coordinates))]
+                self.coordinates[table_key] = coordinate
+            return coordinate, status
 
     def convert_base_10_to_base_7(self, num):
         n = 3
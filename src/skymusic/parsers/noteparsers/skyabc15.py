@@ -28,6 +28,9 @@ class SkyABC15(noteparser.NoteParser):
 
     coord_map = {'.': (-1, -1)}
     inv_coord_map = {(-1, -1): '.'}
+    COORDINATE_ERRORS = {**noteparser.NoteParser.COORDINATE_ERRORS,
+                         noteparser.UNKNOWN_NOTE: (KeyError, "Note {note} was not found in the coord_map dictionary."),
+                         noteparser.OUT_OF_RANGE: (KeyError, "Note {note} was not in range of the Sky keyboard.")}
 
     def __init__(self, *args, **kwargs):
 
@@ -46,34 +49,39 @@ class SkyABC15(noteparser.NoteParser):
                 self.coord_map[chr(i0+row)+str(col+1)] = (row, col)
                 self.inv_coord_map[(row,col)] = chr(i0+row)+str(col+1)
 
+    def get_note_names(self):
+        '''Note names of the largest instrument, as matched by note_name_regex'''
+        note_names = [chr(ord('A')+row)+str(col+1) for row in range(3) for col in range(5)]
+        return note_names + [note_name.lower() for note_name in note_names]
+
     def get_coord_map(self, inverse=False):
         return self.inv_coord_map if inverse else self.coord_map                               
 
     def set_shape(self, shape):
-        self.shape = shape
-        self.__set_coord_maps__(shape)                
+        super().set_shape(shape)
+        self.__set_coord_maps__(self.shape)                
 
-    def calculate_coordinate_for_note(self, note, song_key=None, note_shift=0, is_finding_key=False):
+    def try_calculate_coordinate_for_note(self, note, song_key=None, note_shift=0, is_finding_key=False):
         """
-        Returns a tuple containing the row index and the column index of the note's position.
+        Returns a tuple containing the row index and the column index of the note's position, and a status code.
         """
         note = note.upper()
 
         if note in self.coord_map.keys():  # Note Shift (ie transposition in Sky)
             pos = self.coord_map[note]  # tuple
             if (pos[0] < 0) and (pos[1] < 0):  # Special character
-                return pos
+                return pos, noteparser.COORDINATE_OK
             else:
                 columns = self.get_num_columns()
                 idx = pos[0] * columns + pos[1]
                 idx = idx + note_shift
                 pos = (int(idx / columns), idx - columns * int(idx / columns))
                 if (0, 0) <= pos <= (2, 4):
-                    return pos
+                    return pos, noteparser.COORDINATE_OK
                 else:
-                    raise KeyError('Note ' + str(note) + ' was not in range of the Sky keyboard.')
+                    return pos, noteparser.OUT_OF_RANGE
         else:
-            raise KeyError('Note ' + str(note) + ' was not found in the coord_map dictionary.')
+            return None, noteparser.UNKNOWN_NOTE
 
     def get_note_from_coord(self, coord):
 
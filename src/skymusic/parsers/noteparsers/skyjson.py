@@ -21,6 +21,9 @@ class SkyJson(noteparser.NoteParser):
     """
     coord_map = {'.': (-1, -1)}
     inv_coord_map = {(-1, -1): '.'}
+    COORDINATE_ERRORS = {**noteparser.NoteParser.COORDINATE_ERRORS,
+                         noteparser.UNKNOWN_NOTE: (KeyError, "Note {note} was not found in the coord_map dictionary."),
+                         noteparser.OUT_OF_RANGE: (KeyError, "Note {note} was not in range of the Sky keyboard.")}
     note_prefix = 'Key'
     map_zeros = 1 #Preprend 0 for 0-9
     inv_map_zeros = 0
@@ -58,30 +61,30 @@ class SkyJson(noteparser.NoteParser):
         return self.inv_coord_map if inverse else self.coord_map                               
 
     def set_shape(self, shape):
-        self.shape = shape
-        self.__set_coord_maps__(shape)
+        super().set_shape(shape)
+        self.__set_coord_maps__(self.shape)
 
-    def calculate_coordinate_for_note(self, note, song_key=None, note_shift=0, is_finding_key=False):
+    def try_calculate_coordinate_for_note(self, note, song_key=None, note_shift=0, is_finding_key=False):
         """
-        Returns a tuple containing the row index and the column index of the note's coord.
+        Returns a tuple containing the row index and the column index of the note's coord, and a status code.
         """
         note = self.sanitize_note_name(note)
 
         if note in self.coord_map.keys():  # Note Shift (ie transposition in Sky)
             pos = self.coord_map[note]  # tuple
             if (pos[0] < 0) and (pos[1] < 0):  # Special character
-                return pos
+                return pos, noteparser.COORDINATE_OK
             else:
                 columns = self.get_num_columns()
                 idx = pos[0] * columns + pos[1]
                 idx = idx + note_shift
                 pos = (int(idx / columns), idx - columns * int(idx / columns))
                 if (0, 0) <= pos <= (2, 4):
-                    return pos
+                    return pos, noteparser.COORDINATE_OK
                 else:
-                    raise KeyError('Note ' + str(note) + ' was not in range of the Sky keyboard.')
+                    return pos, noteparser.OUT_OF_RANGE
         else:
-            raise KeyError('Note ' + str(note) + ' was not found in the coord_map dictionary.')
+            return None, noteparser.UNKNOWN_NOTE
 
     def get_note_from_coord(self, coord, layer_index=0, version='old'):
         '''string representation of note, using unpadded layer numbers, or list'''
@@ -45,6 +45,7 @@ class SkyKeyboard(skyabc15.SkyABC15):
             
         regex = re.sub(r'[^A-Z]','',''.join(self.coord_map.keys()))
         regex += regex.lower()
+        self.keys = regex
         #Cannot set these regex as class properties because we need to know the locale first
         self.note_name_with_octave_regex = re.compile(r'([' + regex + r'])')
         self.note_name_regex = self.note_name_with_octave_regex
@@ -68,8 +69,12 @@ class SkyKeyboard(skyabc15.SkyABC15):
                     pass
         
     def set_shape(self, shape):
-        self.shape = shape
-        self.__set_coord_maps__(shape)
+        super().set_shape(shape)
+        self.__set_coord_maps__(self.shape)
         
+    def get_note_names(self):
+        '''Keyboard keys matched by note_name_regex'''
+        return list(self.keys)
+
     def get_coord_map(self, inverse=False):
         return self.inv_coord_map if inverse else self.coord_map                                                                        
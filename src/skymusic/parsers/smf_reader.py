@@ -0,0 +1,134 @@
+"""Decodes Standard MIDI Files into compact events, without mido"""
+import struct
+from collections import namedtuple
+
+# An event of a MIDI track, with the attributes of the mido messages read by MidiSongParser
+MidiEvent = namedtuple('MidiEvent', ['type', 'time', 'is_meta', 'note', 'velocity', 'name', 'key', 'text', 'tempo'],
+                       defaults=[None] * 6)
+
+CHANNEL_MESSAGES = {0x80: ('note_off', 2), 0x90: ('note_on', 2), 0xA0: ('polytouch', 2), 0xB0: ('control_change', 2),
+                    0xC0: ('program_change', 1), 0xD0: ('aftertouch', 1), 0xE0: ('pitchwheel', 2)}
+SYSTEM_MESSAGES = {0xF1: ('quarter_frame', 1), 0xF2: ('songpos', 2), 0xF3: ('song_select', 1),
+                   0xF6: ('tune_request', 0), 0xF8: ('clock', 0), 0xFA: ('start', 0), 0xFB: ('continue', 0),
+                   0xFC: ('stop', 0), 0xFE: ('active_sensing', 0)}
+META_MESSAGES = {0x00: 'sequence_number', 0x01: 'text', 0x02: 'copyright', 0x03: 'track_name',
+                 0x04: 'instrument_name', 0x05: 'lyrics', 0x06: 'marker', 0x07: 'cue_marker', 0x09: 'device_name',
+                 0x20: 'channel_prefix', 0x21: 'midi_port', 0x2F: 'end_of_track', 0x51: 'set_tempo',
+                 0x54: 'smpte_offset', 0x58: 'time_signature', 0x59: 'key_signature', 0x7F: 'sequencer_specific'}
+# Key names by number of sharps (negative for flats), for major and minor modes, as named by mido
+MAJOR_KEYS = ['Cb', 'Gb', 'Db', 'Ab', 'Eb', 'Bb', 'F', 'C', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#']
+MINOR_KEYS = ['Abm', 'Ebm', 'Bbm', 'Fm', 'Cm', 'Gm', 'Dm', 'Am', 'Em', 'Bm', 'F#m', 'C#m', 'G#m', 'D#m', 'A#m']
+
+
+class SmfFile:
+    """
+    The tracks of events of a Standard MIDI File, with the attributes of mido.MidiFile read by MidiSongParser.
+    Tracks are tuples of immutable events, so that decoded files can be shared.
+    """
+    def __init__(self, file_type, ticks_per_beat, tracks):
+        self.type = file_type
+        self.ticks_per_beat = ticks_per_beat
+        self.tracks = tuple(tracks) # A tuple of events per track, with delta times in ticks
+        self.filename = None
+
+
+def read_smf(midi_bytes):
+    """
+    Returns an SmfFile from the bytes of a Standard MIDI File.
+    Chunks other than tracks are skipped, and a truncated last track is kept up to its last complete event.
+    Raises ValueError if the bytes are not a MIDI file or hold an undefined message.
+    """
+    data = memoryview(midi_bytes)
+    if len(data) < 14 or data[:4] != b'MThd':
+        raise ValueError('no MIDI header found')
+    (header_size, file_type, num_tracks, ticks_per_beat) = struct.unpack_from('>Lhhh', data, 4)
+    pos = 8 + header_size
+    tracks = []
+    while len(tracks) < num_tracks and pos + 8 <= len(data):
+        (chunk_type, chunk_size) = struct.unpack_from('>4sL', data, pos)
+        pos += 8
+        if chunk_type == b'MTrk':
+            tracks.append(tuple(read_track(data[pos:pos + chunk_size])))
+        pos += chunk_size
+    return SmfFile(file_type, ticks_per_beat, tracks)
+
+
+def read_track(data):
+    """Returns the list of MidiEvents of the bytes of a track chunk"""
+    events = []
+    append = events.append
+    end = len(data)
+    pos = 0
+    status = None # For running status, set by all messages but meta messages, like mido
+    try:
+        while pos < end:
+            delta = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                delta = (delta << 7) | (byte & 0x7F)
+                if byte < 0x80: break
+            byte = data[pos]
+            if byte >= 0x80:
+                pos += 1
+                if byte != 0xFF:
+                    status = byte
+            elif status is None:
+                raise ValueError('running status without a previous status byte')
+            else:
+                byte = status
+
+            if byte == 0xFF:
+                meta_type = data[pos]
+                (size, pos) = read_varint(data, pos + 1)
+                if pos + size > end: break
+                append(meta_event(meta_type, data[pos:pos + size], delta))
+                pos += size
+            elif byte == 0xF0 or byte == 0xF7:
+                (size, pos) = read_varint(data, pos)
+                if pos + size > end: break
+                append(MidiEvent('sysex', delta, False))
+                pos += size
+            else:
+                try:
+                    (message_type, size) = CHANNEL_MESSAGES[byte & 0xF0] if byte < 0xF0 else SYSTEM_MESSAGES[byte]
+                except KeyError:
+                    raise ValueError(f'undefined status byte 0x{byte:02X}')
+                if pos + size > end: break
+                if byte < 0xA0: # note_off and note_on
+                    append(MidiEvent(message_type, delta, False, data[pos], data[pos + 1]))
+                else:
+                    append(MidiEvent(message_type, delta, False))
+                pos += size
+    except IndexError: # Truncated delta time or meta message
+        pass
+    return events
+
+
+def read_varint(data, pos):
+    """Returns a variable-length quantity starting at pos and the position after it"""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return (value, pos)
+
+
+def meta_event(meta_type, payload, delta):
+    """Returns the MidiEvent of a meta message, decoding only the track name, texts, tempo and key signature"""
+    message_type = META_MESSAGES.get(meta_type, 'unknown_meta')
+    if message_type == 'track_name':
+        return MidiEvent(message_type, delta, True, name=bytes(payload).decode('latin1'))
+    elif message_type in ('text', 'copyright'):
+        return MidiEvent(message_type, delta, True, text=bytes(payload).decode('latin1'))
+    elif message_type == 'set_tempo' and len(payload) >= 3:
+        return MidiEvent(message_type, delta, True, tempo=(payload[0] << 16) | (payload[1] << 8) | payload[2])
+    elif message_type == 'key_signature' and len(payload) >= 2:
+        sharps = payload[0] - 256 if payload[0] > 127 else payload[0]
+        key = None
+        if -7 <= sharps <= 7 and payload[1] in (0, 1):
+            key = (MINOR_KEYS if payload[1] else MAJOR_KEYS)[sharps + 7]
+        return MidiEvent(message_type, delta, True, key=key)
+    return MidiEvent(message_type, delta, True)
@@ -1,12 +1,17 @@
-import os, re
+import os, re, itertools
+from concurrent.futures import ProcessPoolExecutor
 from skymusic import instruments, sheetlayout, Lang
 from skymusic.modes import InputMode, InstrumentType
 from skymusic.song import Song
+from skymusic.columnar_song import ColumnarSong
+from skymusic.lazy_song import LazySong
 import skymusic.parsers.noteparsers
 from skymusic.resources import Resources
 from skymusic.parsers.html_parser import HtmlSongParser
 from skymusic.parsers.midi_parser import MidiSongParser
-from skymusic.parsers import music_theory
+from skymusic.parsers import music_theory, line_lexer
+from skymusic.parsers.noteparsers import noteparser
+from skymusic.parsers.line_lexer import LineLexer, delimiter_pattern
 
 class SongParserError(Exception):
     def __init__(self, explanation):
@@ -15,12 +20,24 @@ class SongParserError(Exception):
         return str(self.explanation)
     pass
 
+_worker_args = None # (SongParser, song_key, note_shift) of a process parsing lines in parallel
+
+def _init_worker_(song_parser, song_key, note_shift):
+    global _worker_args
+    _worker_args = (song_parser, song_key, note_shift)
+
+def _parse_chunk_(song_lines):
+    (song_parser, song_key, note_shift) = _worker_args
+    return [song_parser.parse_line(song_line, song_key, note_shift) for song_line in song_lines]
+
+
 class SongParser:
     """
     For parsing a text format into a Song object
     """
     _num_errors = 0
     _max_errors = 30
+    _parallel_threshold = 5000 # Number of lines below which parse_lines_in_parallel stays serial
     
     def __init__(self, maker, silent_warnings=True):
 
@@ -40,7 +57,7 @@ class SongParser:
         #Delimiters must be character or strings
         #The backslash character is forbidden
         #Only regex with the following format are supported: \x, where x is s, t, w, d, n, r, a, r, f, v, or R
-        self.allowed_regex = ['\s', '\t', '\w', '\d', '\n', '\r', '\a', '\e', '\f', '\v', '\R']
+        self.allowed_regex = line_lexer.ALLOWED_REGEX
         ruler_md = r'|'.join(Resources.MARKDOWN_CODES['rulers']) #Markdown codes for rulers
         single_ruler_md = r'|'.join([re.sub(r'(.)\1*','\\1',code) for code in Resources.MARKDOWN_CODES['rulers']]) #Same codes, duplicate characaters removed
         self.ruler_regex = (Resources.DELIMITERS['lyric'] +  # Comment delimiter, optional
@@ -56,6 +73,12 @@ class SongParser:
             self.locale = Lang.guess_locale()
             print(f"**ERROR: SongParser self.maker has no locale. Reverting to {self.locale}")
 
+    def __getstate__(self):
+        # The maker is not needed to parse lines, and is not sent to other processes
+        state = self.__dict__.copy()
+        state['maker'] = None
+        return state
+
     def __print_error__(self,err):
         if not self.silent_warnings:
             print(err)
@@ -167,8 +190,11 @@ class SongParser:
         else:
             raise SongParserError(f"Cannot set input_mode: invalid input_mode: {input_mode}")
 
-    def find_key(self, song_lines=None):
-        return self.music_theory.find_key(song_lines)
+    def find_key(self, song_lines=None, profile=None):
+        return self.music_theory.find_key(song_lines, profile)
+
+    def rank_keys(self, song_lines=None, profile=None):
+        return self.music_theory.rank_keys(song_lines, profile)
 
     def get_note_parser(self, input_mode=None):
 
@@ -196,6 +222,12 @@ class SongParser:
         else:
             return self.note_parser.english_note_name(note_name, reverse)
 
+    def get_lexer(self):
+        """Returns the LineLexer of the current delimiters, shared by all parsers using the same delimiters"""
+        return LineLexer.get(self.icon_delimiter, self.quaver_delimiter, self.lyric_delimiter, self.repeat_indicator,
+                             Resources.DELIMITERS['metadata'], self.ruler_regex, self.layer_regex,
+                             self.input_mode is not InputMode.SKYJSON)
+
     def split_icon(self, icon, delimiter=None):
         """
         A song is a list of icons
@@ -203,24 +235,14 @@ class SongParser:
         This method splits an icon into a list of chords:  ['A1C2', 'F3D4', 'C#4B4', 'Gb3A2']
         """
         if delimiter is None:
-            delimiter = self.quaver_delimiter
-            if delimiter in self.allowed_regex:
-                return re.compile(delimiter).split(icon)
-            else:
-                return icon.split(delimiter)
+            return self.get_lexer().quaver_splitter.split(icon)
+        return re.split(delimiter_pattern(delimiter), icon)
 
     def split_repeat(self, chord):
         """
         Separates the chords from its repeat indicator
         """
-        try:
-            repeat = int(re.split(re.escape(self.repeat_indicator), chord)[1])
-        except (IndexError, ValueError):
-            repeat = 1
-        else:
-            chord = re.split(re.escape(self.repeat_indicator), chord)[0]
-
-        return repeat, chord
+        return self.get_lexer().split_repeat(chord)
 
     def split_chord(self, chord, note_parser=None):
         """
@@ -230,7 +252,7 @@ class SongParser:
         if note_parser is None: note_parser = self.note_parser
 
         try:
-            chord = note_parser.note_name_regex.sub(' \\1', chord).split()
+            chord = note_parser.split_chord(chord)
         except AttributeError as err:
             self.__print_error__(err)
 
@@ -245,57 +267,73 @@ class SongParser:
         # A isolated note is a single-element list: chords=['A5']
         # An isolated chord is a single element list: chords=['B1A1A3']
         # Triplets and quavers have been decomposed into a list of notes or chords: chords=['B2', 'B3B1', 'B4', 'B5', 'C1', 'C2']
-        harp_broken = True
+        if self.note_parser is None: self.set_note_parser()
+        is_chord_parser = hasattr(self.note_parser, 'decode_chord')
+
+        chords_notes = []
+        for chord in chords:
+            repeat, chord = self.split_repeat(chord)
+            if is_chord_parser: chord = self.note_parser.decode_chord(chord) #Cmaj7': f"C{x}E{x}G{x}B{x}" 
+            chords_notes.append(self.split_chord(chord))
+            # Now the real chord has been split in notes (1 note = 1 list slot)
+
+        return [*self.build_skygrid(chords_notes, song_key, note_shift), repeat]
 
+    def build_skygrid(self, chords_notes, song_key=Resources.DEFAULT_KEY, note_shift=0):
+        """
+        Creates a skygrid from the notes of each chord of a harp: chords_notes=[['B2'], ['B3', 'B1']]
+        Returns the skygrid, whether the harp is broken and whether it is silent
+        """
         # Notes/chords in quavers and triplets have a frame index >= 1
         # A black/white note or chord has a frame index == 0
-        start_frame = 1 if len(chords) > 1 else 0     
+        start_frame = 1 if len(chords_notes) > 1 else 0
 
         if self.note_parser is None: self.set_note_parser()
-        is_chord_parser = hasattr(self.note_parser, 'decode_chord')
         skygrid = instruments.Skygrid(shape=self.note_parser.get_shape())
 
-        for chord_idx, chord in enumerate(chords):
-
-            repeat, chord = self.split_repeat(chord)
-            if is_chord_parser: chord = self.note_parser.decode_chord(chord) #Cmaj7': f"C{x}E{x}G{x}B{x}" 
-            notes = self.split_chord(chord)
-            # Now the real chord has been split in notes (1 note = 1 list slot)
+        harp_broken = True
+        harp_silent = True
+        for chord_idx, notes in enumerate(chords_notes):
 
             harp_broken = False # No probllem detected yet, so the Harp is a priori OK
             harp_silent = True  # No note detected yet, so the Harp is a priori silent
             for note in notes:  # Chord is a list of notes
-                note_broken = False
-                try:
-                    if note == self.pause:
-                        highlighted_coords = (-1, -1)
-                    else:
-                        highlighted_coords = self.note_parser.calculate_coordinate_for_note(note, song_key,
-                                                                             note_shift, False)
-                except (KeyError, SyntaxError) as err:
-                    note_broken = True
+                if note == self.pause:
+                    (highlighted_coords, status) = ((-1, -1), noteparser.COORDINATE_OK)
+                else:
+                    (highlighted_coords, status) = self.note_parser.try_get_coordinate_for_note(note, song_key,
+                                                                                     note_shift, False)
+                    if status == noteparser.COORDINATE_OK and not skygrid.is_in_shape(highlighted_coords):
+                        status = noteparser.OUT_OF_RANGE # Not on this instrument, e.g. A5 on the 2*4 drum
+                if status != noteparser.COORDINATE_OK:
                     harp_broken = True
                     harp_silent = False # Harp is broken, so it's not silent
-                    if not self.silent_warnings: self.__print_error__(err)
-                
-                if not note_broken:
+                    if not self.silent_warnings:
+                        self.__print_error__(self.note_parser.coordinate_error(note, highlighted_coords, status))
+                else:
                     highlighted = (highlighted_coords[0] >= 0 and highlighted_coords[1] >= 0)
                     skygrid.set_note(highlighted_coords, start_frame + chord_idx, highlighted)
                     if highlighted: harp_silent = False
 
-        results = [skygrid, harp_broken, harp_silent, repeat]
-        return results
+        # Identical icons share the same immutable grid
+        return instruments.Skygrid.intern(skygrid), harp_broken, harp_silent
+
+    def build_harp(self, skygrid, harp_broken=False, harp_silent=False, repeat=1):
+        """Creates an instrument of the current instrument type from its skygrid"""
+        harp = self.get_instrument_type().get_instrument()
+        harp.set_repeat(repeat)
+        harp.set_is_silent(harp_silent)
+        harp.set_is_broken(harp_broken)
+        harp.set_skygrid(skygrid)
+        return harp
 
     def convert_bracket_chords(self, line):
         
-        bracket_chord = re.compile(r'(?:\(|\[)((?:\w+\s*)+)(?:\)|\])')
-        line = bracket_chord.sub(lambda mo:re.sub(r'\s','',mo.group(1)), line)
-        return line
+        return LineLexer.bracket_chord.sub(lambda mo:LineLexer.blanks.sub('',mo.group(1)), line)
     
     def remove_script_tags(self,line):
         '''Remove HTML script tags in song text to prevent hacking'''
-        script_tags = re.compile('<\s*/*\s*script[^>]*>', re.I)
-        return script_tags.sub('',line)
+        return LineLexer.script_tags.sub('',line)
     
     def sanitize_line(self, line):
         """
@@ -303,25 +341,7 @@ class SongParser:
         :param line:
         :return:
         """
-        if self.input_mode is not InputMode.SKYJSON:
-            line = self.convert_bracket_chords(line)
-        
-        line = re.sub('(\s){2,}', '\\1', line)  # removes surnumerous blank characters
-        line = line.strip()
-        
-        line = self.remove_script_tags(line)
-        
-        if self.icon_delimiter in self.allowed_regex:
-            delimiter = self.icon_delimiter
-        elif self.icon_delimiter==' ':
-            delimiter = '\s'
-        else:
-            delimiter = re.escape(self.icon_delimiter)       
-
-        line = re.sub('(' + delimiter + ')' + '{2,}', '\\1', line)  # removes surnumerous delimiters
-        line = re.sub('^'+delimiter+'|'+delimiter+'$','', line) #strip delimiters on edges
-        
-        return line
+        return self.get_lexer().sanitize_line(line)
 
     
     def split_line(self, line, delimiter=None):
@@ -331,68 +351,63 @@ class SongParser:
         Icons will be visually split in SkyGrid renders (aka Harps), possibly with pauses between them
         """
         if delimiter is None:
+            lexer = self.get_lexer()
             if line[0] == self.lyric_delimiter:
-                delimiter = self.lyric_delimiter
+                return lexer.lyric_splitter.split(line)
             else:
-                delimiter = self.icon_delimiter
-            
-        if delimiter in self.allowed_regex:
-            return re.compile(delimiter).split(line)
-        elif delimiter=="#":# to allow HTML/CSS hex color codes
-            return re.compile(r'(?<!"|\'|:|#)#').split(line)
-        elif delimiter=="%":# to allow percentages in HTML/CSS size attributes
-            return re.compile(r'%(?!"|\')').split(line)
-        else:
-            return line.split(delimiter)
+                return lexer.icon_splitter.split(line)
+        return re.split(delimiter_pattern(delimiter), line)
+
+
+    def count_instruments(self, line):
+        """
+        Returns the number of instruments that parse_line would create from a sanitized line,
+        without parsing its notes
+        """
+        kind, tokens = self.get_lexer().tokenize(line)
+        if kind is None:
+            return 0
+        if kind in (line_lexer.RULER, line_lexer.LAYER):
+            return 1
+        return len(tokens)
 
 
     def parse_line(self, line, song_key=Resources.DEFAULT_KEY, note_shift=0):
         """
-        Takes a single string
+        Takes a single string, or a list of icons of chords of notes from MidiSongParser.parse_midi
         Returns instrument_line: a list of  'skygrid' objects (1 skygrid = 1 dict)
         """
-        instrument_line = []
-        line = self.sanitize_line(line)
+        if not isinstance(line, str):
+            # Icons of a MIDI track, already split into chords of notes by MidiSongParser.parse_midi
+            return [self.build_harp(*self.build_skygrid(chords_notes, song_key, note_shift)) for chords_notes in line]
 
-        if len(line) > 0 and not re.match(re.escape(Resources.DELIMITERS['metadata']),line):
-                       
-            hr_match = re.match(self.ruler_regex, line)
-            lay_match = re.match(self.layer_regex, line)
-            
-            if hr_match:                
-                hr = sheetlayout.Ruler()
-                hr.set_code(hr_match.group('code')) # Markdown code
-                hr.set_text(re.sub(re.escape(self.lyric_delimiter),'',hr_match.group('text'))) # possible text                
-                instrument_line.append(hr)
-            
-            elif lay_match:
-                lay = sheetlayout.Layer()
-                lay.set_code(lay_match.group('code')) # Code
-                lay.set_text(re.sub(re.escape(self.lyric_delimiter),'',lay_match.group('text'))) # possible text
-                instrument_line.append(lay)   
-                                                                        
-            elif line[0] == self.lyric_delimiter:
-                lyrics = self.split_line(line)
-                for lyric in lyrics:
-                    if len(lyric) > 0:
-                        voice = instruments.Voice()
-                        voice.set_lyric(lyric.strip())
-                        instrument_line.append(voice)
-            else:
-                icons = self.split_line(line)
-                
-                for icon in icons:
-                    chords = self.split_icon(icon)
-                    # From here, real chords are still glued, quavers have been split in different list slots
-                    skygrid, harp_broken, harp_silent, repeat = self.parse_chords(chords, song_key, note_shift)
-                    
-                    harp = self.instrument_type.get_instrument()
-                    harp.set_repeat(repeat)
-                    harp.set_is_silent(harp_silent)
-                    harp.set_is_broken(harp_broken)
-                    harp.set_skygrid(skygrid)
-
-                    instrument_line.append(harp)
+        instrument_line = []
+        lexer = self.get_lexer()
+        kind, tokens = lexer.tokenize(lexer.sanitize_line(line))
+
+        if kind == line_lexer.RULER:
+            hr = sheetlayout.Ruler()
+            hr.set_code(tokens.group('code')) # Markdown code
+            hr.set_text(tokens.group('text').replace(self.lyric_delimiter, '')) # possible text
+            instrument_line.append(hr)
+
+        elif kind == line_lexer.LAYER:
+            lay = sheetlayout.Layer()
+            lay.set_code(tokens.group('code')) # Code
+            lay.set_text(tokens.group('text').replace(self.lyric_delimiter, '')) # possible text
+            instrument_line.append(lay)
+
+        elif kind == line_lexer.LYRICS:
+            for lyric in tokens:
+                voice = instruments.Voice()
+                voice.set_lyric(lyric.strip())
+                instrument_line.append(voice)
+
+        elif kind == line_lexer.ICONS:
+            for chords in tokens:
+                # From here, real chords are still glued, quavers have been split in different list slots
+                skygrid, harp_broken, harp_silent, repeat = self.parse_chords(chords, song_key, note_shift)
+                instrument_line.append(self.build_harp(skygrid, harp_broken, harp_silent, repeat))
         
         return instrument_line
 
@@ -433,47 +448,137 @@ class SongParser:
         return (changed, meta_data)
 
 
-    def parse_song(self, song_lines, song_key, octave_shift):
+    def convert_song_lines(self, song_lines, as_text=True):
         """
-        Create a Song object from the textual song in 'song_lines'
-        Requires knowledge of the input mode and the song key.
+        Returns the lines of text of a song given as a string, a list of lines or any iterable of lines.
+        HTML, MIDI and JSON songs are read entirely and converted into a list of lines of text.
+        If as_text is False, the tracks of MIDI songs are lists of icons instead of lines of text, see parse_line.
         """
         if isinstance(song_lines, str):  # Break newlines and make sure the result is a List
             song_lines = song_lines.strip().split(os.linesep)
             
         if self.input_mode == InputMode.SKYHTML:
-            song_lines = HtmlSongParser().parse_html(song_lines)
+            song_lines = HtmlSongParser().parse_html(list(song_lines))
         elif self.input_mode == InputMode.MIDI:
-            song_lines = MidiSongParser(self.maker, self.silent_warnings).parse_midi(song_lines)
+            song_lines = MidiSongParser(self.maker, self.silent_warnings).parse_midi(list(song_lines), as_text)
         elif self.input_mode == InputMode.SKYJSON:
             from . import json_parser
             parser = json_parser.JsonSongParser(self.maker, self.silent_warnings)
-            song_lines = parser.sanitize_lines(song_lines,join=True)
+            song_lines = parser.sanitize_lines(list(song_lines),join=True)
+
+        return song_lines
+
+
+    def parse_song_head(self, song_lines, song):
+        """
+        Sets the metadata found at the head of 'song_lines' in 'song', reading no further than the first line of music.
+        Returns an iterator over all the lines of the song, including the head
+        """
+        head = []
+        if self.input_mode == InputMode.SKYJSON:
+            (changed, meta_data) = self.parse_metadata(song_lines, song)
+            from . import json_parser
+            parser = json_parser.JsonSongParser(self.maker, self.silent_warnings)
+            parser.set_input_mode(self.input_mode)
+            song_lines = parser.parse_layers(song_lines[0])
+        else:
+            song_lines = iter(song_lines)
+            for line in song_lines:
+                head.append(line)
+                if not isinstance(line, str): # Icons of a MIDI track
+                    break
+                line = self.sanitize_line(line)
+                if line and not line.startswith(Resources.DELIMITERS['metadata']):
+                    break
+            (changed, meta_data) = self.parse_metadata([line for line in head if isinstance(line, str)], song)
+
+        # Metadata first, indicates by a special character such as #$
+        if changed:
+            song.set_meta(**meta_data)
+            song.set_meta_changed(True)
+
+        return itertools.chain(head, song_lines)
+
+
+    def parse_lines_in_parallel(self, song_lines, song_key, note_shift, max_workers=None):
+        """
+        Returns the list of instrument lines of 'song_lines', parsed by chunks in a pool of processes, in order.
+        Lines are parsed serially when there are fewer than SongParser._parallel_threshold, or a single CPU.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if len(song_lines) < self._parallel_threshold or max_workers < 2:
+            return [self.parse_line(song_line, song_key, note_shift) for song_line in song_lines]
+
+        chunk_size = -(-len(song_lines) // (4*max_workers)) # A few chunks per process to balance the load
+        chunks = [song_lines[i:i+chunk_size] for i in range(0, len(song_lines), chunk_size)]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker_,
+                                 initargs=(self, song_key, note_shift)) as executor:
+            return [instrument_line for chunk in executor.map(_parse_chunk_, chunks) for instrument_line in chunk]
+
+
+    def parse_song(self, song_lines, song_key, octave_shift, columnar=False, lazy=False, parallel=False, max_workers=None):
+        """
+        Create a Song object from the textual song in 'song_lines'
+        Requires knowledge of the input mode and the song key.
+        If columnar is True, returns a ColumnarSong, more compact for very long songs.
+        If lazy is True, returns a LazySong, whose lines are parsed only when accessed.
+        If parallel is True, long songs are parsed in max_workers processes, by default one per CPU,
+        see parse_lines_in_parallel.
+        """
+        if columnar and lazy:
+            raise ValueError("A song cannot be both columnar and lazy")
+        if parallel and lazy:
+            raise ValueError("A lazy song cannot be parsed in parallel")
+
+        # MIDI tracks are converted into lines of text only for lazy songs
+        song_lines = self.convert_song_lines(song_lines, as_text=lazy)
             
         english_song_key = self.english_note_name(song_key)
 
         note_shift = self.get_note_parser().get_base_of_western_major_scale() * octave_shift
 
         # Parses song line by line
-        song = Song(locale=self.locale, music_key=english_song_key)
+        if lazy:
+            song = LazySong(self, song_key, note_shift, locale=self.locale, music_key=english_song_key)
+        else:
+            song_class = ColumnarSong if columnar else Song
+            song = song_class(locale=self.locale, music_key=english_song_key)
         
-        # Metadata first, indicates by a special character such as #$
-        (changed, meta_data) = self.parse_metadata(song_lines, song)
-        if changed:
-            song.set_meta(**meta_data)
-            song.set_meta_changed(True)
-         
-        if self.input_mode == InputMode.SKYJSON:
-            from . import json_parser
-            parser = json_parser.JsonSongParser(self.maker, self.silent_warnings)
-            parser.set_input_mode(self.input_mode)
-            song_lines = parser.parse_layers(song_lines[0])                                          
+        song_lines = self.parse_song_head(song_lines, song)
+
+        if parallel:
+            for instrument_line in self.parse_lines_in_parallel(list(song_lines), song_key, note_shift, max_workers):
+                song.add_line(instrument_line)
+            return song
         
-        # IMPORTANT: at this point song_lines is a list of strings                                                                                                                                                                                                                                                                                                                                                                  
         for song_line in song_lines:
+            if lazy:
+                song.add_source_line(song_line)
+                continue
             instrument_line = self.parse_line(song_line, song_key,
                                               note_shift)  # The song key must be in the original format
             song.add_line(instrument_line)
 
         return song
-        
+
+
+    def stream_song(self, song_lines, song_key, octave_shift, song=None):
+        """
+        Generator parsing the textual song in 'song_lines' one line at a time, for songs too long to be held in memory.
+        'song_lines' can be any iterable of lines, such as a text file object, and is read only as lines are needed.
+        Before the first line is yielded, the metadata at the head of the song are set in 'song', if given,
+        e.g. an empty Song to be filled with the yielded lines.
+        Yields the non-empty lines of instruments, as SongParser.parse_line would return them.
+        """
+        if song is None:
+            song = Song(locale=self.locale, music_key=self.english_note_name(song_key))
+
+        song_lines = self.parse_song_head(self.convert_song_lines(song_lines, as_text=False), song)
+
+        note_shift = self.get_note_parser().get_base_of_western_major_scale() * octave_shift
+
+        for song_line in song_lines:
+            instrument_line = self.parse_line(song_line, song_key, note_shift)
+            if instrument_line:
+                yield instrument_line
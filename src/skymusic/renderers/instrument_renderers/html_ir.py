@@ -58,9 +58,6 @@ class HtmlInstrumentRenderer(instrument_renderer.InstrumentRenderer):
         else:
             instr_state = ""
 
-        # Required to get gamepad button name from note coord in the Skygrid
-        note_parser = self.gamepad.get_note_parser(locale=self.locale, shape=(rows,cols)) #Cannot be sooner because we need instrument shape
-        
         num_frames = instrument.get_skygrid().get_num_frames()
         num_buttons = instrument.get_skygrid().get_max_num_by_frame()
         if instr_silent:
@@ -90,11 +87,11 @@ class HtmlInstrumentRenderer(instrument_renderer.InstrumentRenderer):
                     note_coord = html_grid[col][row] #yes, rows and cols are inverted
                     note = instrument.get_note_from_coord(note_coord)
                     
-                    harp_render += note_renderer.render(note,note_parser)
+                    harp_render += note_renderer.render(note)
                     
         if instr_silent or instr_broken: #Draws a blank or a red question mark
             note = instrument.get_note_from_coord(instrument.get_middle_coord())
-            harp_render += note_renderer.render(note, note_parser)               
+            harp_render += note_renderer.render(note)               
             
         harp_render += '</div>' 
         
@@ -47,6 +47,7 @@ class PngInstrumentRenderer(instrument_renderer.InstrumentRenderer):
         self.harp_type = harp_type
         self.empty_harp_png = Resources.PNGS[platform_name][f'empty-{harp_type}']
         self.unhighlighted_harp_png = Resources.PNGS[platform_name][f'unhighlighted-{harp_type}']
+        self.harp_renders = {} #(skygrid signature, broken, silent): harp render before rescaling
 
 
     def set_fonts(self, font_path=None):
@@ -250,9 +251,6 @@ class PngInstrumentRenderer(instrument_renderer.InstrumentRenderer):
         
         note_renderer = png_nr.PngNoteRenderer(platform_name=self.platform_name, gamepad=self.gamepad)
         
-        # Required to get gamepad button name from note coord in the Skygrid
-        note_parser = self.gamepad.get_note_parser(locale=self.locale, shape=instrument.get_shape()) #Cannot be sooner because we need instrument shape
-        
         # No background harp image: size is determined from number of notes
         
         note_size = note_renderer.get_note_size()
@@ -286,7 +284,7 @@ class PngInstrumentRenderer(instrument_renderer.InstrumentRenderer):
                     note = instrument.get_note_from_coord(coord)
                     # NOTE RENDER
                     if len(note.get_highlighted_frames()) > 0:  # Only paste highlighted notes
-                        note_render = note_renderer.render(note=note, rescale=1, note_parser=note_parser)
+                        note_render = note_renderer.render(note=note, rescale=1)
                         harp_render = self.trans_paste(harp_render, note_render, (round(xn), round(yn)))
         
                         yn += note_size[1] + row_gap
@@ -359,10 +357,15 @@ class PngInstrumentRenderer(instrument_renderer.InstrumentRenderer):
     def render_harp(self, instrument, rescale=1.0, max_size=None):
 
 
-        if self.gamepad is None:
-            harp_render = self._render_mobile_harp_(instrument, rescale)
-        else:
-            harp_render = self._render_gamepad_harp_(instrument, rescale)
+        # Identical harps are only drawn once
+        key = (instrument.get_signature(), instrument.get_is_broken(), instrument.get_is_silent())
+        harp_render = self.harp_renders.get(key)
+        if harp_render is None:
+            if self.gamepad is None:
+                harp_render = self._render_mobile_harp_(instrument, rescale)
+            else:
+                harp_render = self._render_gamepad_harp_(instrument, rescale)
+            self.harp_renders[key] = harp_render
 
         # Rescaling
         if max_size is not None:
@@ -7,7 +7,7 @@ class SkyjsonInstrumentRenderer(instrument_renderer.InstrumentRenderer):
     
     def __init__(self, locale=None):
         super().__init__(locale)
-        self.note_parser = skyjson_parser.SkyJson()
+        self.note_parser = skyjson_parser.SkyJson.get_shared()
 
     def render_harp(self, *args, **kwargs):
 
@@ -163,9 +163,6 @@ class SvgInstrumentRenderer(instrument_renderer.InstrumentRenderer):
         
         note_renderer = SvgNoteRenderer(platform_name=self.gamepad.platform.get_name(),gamepad=self.gamepad)
         
-        # Required to get gamepad button name from note coord in the Skygrid
-        note_parser = self.gamepad.get_note_parser(locale=self.locale, shape=instrument.get_shape()) #Cannot be sooner because we need instrument shape
-        
         # The harp SVG container
         css_class = "gp instr"
         
@@ -203,7 +200,7 @@ class SvgInstrumentRenderer(instrument_renderer.InstrumentRenderer):
                 note = instrument.get_note_from_coord(coord)
                 # NOTE RENDER
                 if len(note.get_highlighted_frames()) > 0:  # Only paste highlighted notes  
-                    harp_render += note_renderer.render(note, xs=f"{100*xn :.2f}%", ys=f"{100*yn :.2f}%", widths=f"{100*rel_note_width :.2f}%", heights=f"{100*rel_note_height :.2f}%", note_parser=note_parser)
+                    harp_render += note_renderer.render(note, xs=f"{100*xn :.2f}%", ys=f"{100*yn :.2f}%", widths=f"{100*rel_note_width :.2f}%", heights=f"{100*rel_note_height :.2f}%")
     
                     yn += rel_note_height + rel_row_gap
                     
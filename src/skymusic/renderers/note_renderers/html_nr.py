@@ -34,7 +34,7 @@ class HtmlNoteRenderer(note_renderer.NoteRenderer):
     def get_unhighlighted_gamepad_svg(self):
         return "<gpblank></gpblank>"    
 
-    def render(self, note, note_parser=None):
+    def render(self, note):
         
         gamepad = self.gamepad
         
@@ -86,7 +86,7 @@ class HtmlNoteRenderer(note_renderer.NoteRenderer):
                     aspect = self.get_aspect(note)
                     note_core_render = self._get_mobile_svg_(aspect, highlighted_classes)
                 else:
-                    button = note_parser.get_note_from_coord((row,col))
+                    button = note.get_button(gamepad)
                     note_core_render = self._get_gamepad_svg_(gamepad, button, highlighted_classes)
         
         return note_core_render
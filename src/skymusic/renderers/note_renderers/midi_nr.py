@@ -12,19 +12,17 @@ class MidiNoteRenderer(note_renderer.NoteRenderer):
 
     def __init__(self, music_key=Resources.DEFAULT_KEY):
         self.music_key = music_key
+        try:
+            self.root_pitch = Resources.MIDI_PITCHES[self.music_key]
+        except KeyError:
+            self.root_pitch = Resources.MIDI_PITCHES[Resources.DEFAULT_KEY]
 
     def render(self, note, event_type, delta_t=0):
         """
         Starts or ends a MIDI note, assuming a chromatic scale (12 semitones)
         """
-        octave = int(note.get_index() / 7) #7 because of the heptatonic tone scale of Sky (no accidentals)
-        semi = Resources.MIDI_SEMITONES[int(note.get_index()) % 7]
-        try:
-            root_pitch = Resources.MIDI_PITCHES[self.music_key]
-        except KeyError:
-            root_pitch = Resources.MIDI_PITCHES[Resources.DEFAULT_KEY]
-            
-        note_pitch = root_pitch + octave * 12 + semi
+        # Octave and semitone offset from the root, read from the note table of the instrument shape
+        note_pitch = self.root_pitch + note.get_info().semitone
 
         if len(note.get_highlighted_frames()) == 0:
             midi_render = None
@@ -60,10 +60,11 @@ class PngNoteRenderer(note_renderer.NoteRenderer):
             return Image.open(note_png)
          
         
-    def _get_mobile_png_(self, aspect, coord, highlighted_frames):
-                
+    def _get_mobile_png_(self, note_info, highlighted_frames):
+        
+        aspect = note_info.aspect
         if highlighted_frames[0] == 0:
-            row_name = self.row_names[coord[0]]
+            row_name = note_info.row_name
             try:
                 note_png = Resources.PNGS[self.platform_name][f"{row_name}-{aspect}"]        
             except KeyError:
@@ -91,7 +92,7 @@ class PngNoteRenderer(note_renderer.NoteRenderer):
         return Image.open(note_png) if note_png else None
     
 
-    def render(self, note, rescale=1.0, note_parser=None):
+    def render(self, note, rescale=1.0):
         
         note_coord = note.get_coord()
 
@@ -102,11 +103,10 @@ class PngNoteRenderer(note_renderer.NoteRenderer):
             else:
                 # Draws an highlighted note
                 if not self.gamepad:
-                    note_aspect = self.get_aspect(note)
                     highlighted_frames = note.get_highlighted_frames()
-                    png_render = self._get_mobile_png_(note_aspect, note_coord, highlighted_frames)
+                    png_render = self._get_mobile_png_(note.get_info(), highlighted_frames)
                 else:
-                    note_button = note_parser.get_note_from_coord(note_coord)
+                    note_button = note.get_button(self.gamepad)
                     png_render = self._get_gamepad_png_(note_button)
                     
         else:
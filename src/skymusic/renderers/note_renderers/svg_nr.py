@@ -42,7 +42,7 @@ class SvgNoteRenderer(note_renderer.NoteRenderer):
         else:
             return (self.gp_note_size[0]/self.gp_note_size[1], 1)
 
-    def render(self, note, xs="0%", ys="0%", widths="10%", heights="10%", note_parser=None):
+    def render(self, note, xs="0%", ys="0%", widths="10%", heights="10%"):
         
         (row, col) = note.get_coord()
         try:
@@ -88,7 +88,7 @@ class SvgNoteRenderer(note_renderer.NoteRenderer):
                         aspect = self.get_aspect(note)
                         note_core_render = self._get_mobile_svg_(aspect, xs, ys, widths, widths, highlighted_classes)
                     else:
-                        note_button = note_parser.get_note_from_coord((row, col) )
+                        note_button = note.get_button(self.gamepad)
                         note_core_render = self._get_gamepad_svg_(note_button, xs, ys, widths, widths)
            
         svg_render = note_core_render
@@ -36,6 +36,7 @@ class PseudoInstrument():
 class Ruler(PseudoInstrument):
     
     codes = Resources.MARKDOWN_CODES['rulers']
+    state_attrs = ('repeat', 'index', 'code', 'text', 'emphasis') # Attributes saved by pickle
     
     def __init__(self, code=None):
         super().__init__()
@@ -46,6 +47,12 @@ class Ruler(PseudoInstrument):
         self.emphasis = ''
     
     def get_is_decorative(self): return True
+
+    def __reduce__(self):
+        return (self.__class__, (), tuple(getattr(self, attr) for attr in self.state_attrs))
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.state_attrs, state): setattr(self, attr, value)
     
     def set_text(self, text: str):
         self.text = text[:64].strip()
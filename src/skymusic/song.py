@@ -1,3 +1,4 @@
+import hashlib
 from skymusic import instruments, Lang
 from skymusic.renderers.song_renderers import html_sr, svg_sr, png_sr, midi_sr, skyjson_sr, ascii_sr
 from skymusic.modes import RenderMode
@@ -15,7 +16,14 @@ class Song():
 
         self.locale = locale
 
-        self.lines = []        
+        self.lines = []
+        # Statistics, kept up to date by add_line
+        self._num_instruments = 0
+        self._num_broken = 0
+        self._max_instruments_per_line = 0
+        self._harp_type = None # Type of the first tonal instrument starting a line
+        self._harp_aspect_ratio = None # Aspect ratio of the first instrument starting a line that has one
+        self._lines_digest = hashlib.sha256() # Digest of the lines, updated by add_line
         self.meta = {
                     'title': [Lang.get_string("song_meta/title", self.locale) + ': ', Lang.get_string("song_meta/untitled", self.locale)],
                     'artist': [Lang.get_string("song_meta/artist", self.locale) + ': ', ''],
@@ -24,13 +32,41 @@ class Song():
         
         self.is_meta_changed = False
         
+    def __reduce__(self):
+        # Statistics and digest are not pickled: add_line recomputes them when unpickling
+        return (self.__class__, (self.locale, self.music_key), (self.meta, self.is_meta_changed, list(self.get_lines())))
+
+    def __setstate__(self, state):
+        (self.meta, self.is_meta_changed, lines) = state
+        for line in lines: self.add_line(line)
+
     def get_title(self):
 
         return self.meta['title'][1]
 
     def add_line(self, line):
         """Adds a line of Instrument to the Song"""
-        if len(line) > 0: self.lines.append(line)
+        if len(line) > 0:
+            self.lines.append(line)
+            self._count_line_(line)
+            self._hash_line_(line)
+
+    def _count_line_(self, line):
+        """Updates the statistics of the Song with a new line"""
+        self._num_instruments += len(line)
+        self._max_instruments_per_line = max(self._max_instruments_per_line, len(line))
+        for instrument in line:
+            try:
+                self._num_broken += int(instrument.get_is_broken())
+            except AttributeError:
+                pass
+        if self._harp_type is None and line[0].get_is_tonal():
+            self._harp_type = line[0].get_type()
+        if self._harp_aspect_ratio is None:
+            try:
+                self._harp_aspect_ratio = line[0].get_aspect_ratio()
+            except AttributeError:
+                pass
 
     def get_line(self, row):
         """Returns line #row, if row is in the Song, or else returns an empty list"""
@@ -87,55 +123,50 @@ class Song():
     def __str__(self):
         return f"<{self.__class__.__name__} '{self.get_title()}', {self.get_num_lines()} lines, {self.get_num_instruments()} instruments, {self.get_num_broken()} errors>"
 
+    def _hash_line_(self, line):
+        """Updates the digest of the lines with a new line"""
+        fields = ['line', str(len(line))]
+        for instrument in line:
+            fields += [instrument.get_type(), str(instrument.get_repeat())]
+            if instrument.get_is_tonal():
+                (shape, masks) = instrument.get_signature()
+                fields += [str(int(instrument.get_is_broken())), str(int(instrument.get_is_silent())),
+                           f'{shape[0]}x{shape[1]}', ','.join(f'{mask :x}' for mask in masks)]
+            else:
+                fields += [str(getattr(instrument, 'code', '') or ''), instrument.get_text(),
+                           str(getattr(instrument, 'emphasis', '') or '')]
+        # Fields are prefixed with their length so that no two different lines give the same bytes
+        self._lines_digest.update(''.join(f'{len(field)}:{field}' for field in fields).encode('utf-8'))
+
+    def content_hash(self):
+        """
+        Returns a hexadecimal digest of the Song content: music key, metadata values, and for each line,
+        the types, repeats, broken/silent flags and grids of instruments, and the texts of voices and rulers.
+        Songs with the same content have the same digest, across runs and machines.
+        """
+        fields = [self.music_key] + [f'{k}={self.meta[k][1]}' for k in sorted(self.meta)]
+        head = ''.join(f'{len(field)}:{field}' for field in fields).encode('utf-8')
+        return hashlib.sha256(head + self._lines_digest.digest()).hexdigest()
+
     def get_num_instruments(self):
         """Returns the number of instruments in the Song"""
-        c = 0
-        for line in self.lines:
-            c += len(line)
-        return c
+        return self._num_instruments
 
     def get_harp_aspect_ratio(self):        
         
-        aspect_ratio = 1
-        
-        if self.get_num_instruments() == 0:
-            return aspect_ratio
-        
-        for line in self.lines:
-            harp = line[0]
-            try:
-                aspect_ratio = harp.get_aspect_ratio()
-                break
-            except AttributeError:
-                pass
-                
-        return aspect_ratio
+        return 1 if self._harp_aspect_ratio is None else self._harp_aspect_ratio
 
     def get_harp_type(self):
 
-        for line in self.lines:
-            if line[0].get_is_tonal():
-                return line[0].get_type()
-        
-        return 'harp'            
+        return 'harp' if self._harp_type is None else self._harp_type
 
     def get_num_broken(self):
         """Returns the number of broken instruments in the Song"""
-        b = 0
-        for line in self.lines:
-            for harp in line:
-                try:
-                    b += int(harp.get_is_broken())
-                except:
-                    pass
-        return b
+        return self._num_broken
 
     def get_max_instruments_per_line(self):
         """Returns the number of instruments in the longest line"""
-        if len(self.lines) > 0:
-            return max(list(map(len, self.lines)))
-        else:
-            return 0     
+        return self._max_instruments_per_line
     
     def get_meta(self):
         
@@ -0,0 +1,73 @@
+'''
+Writes every song of test_songs/ in binary format, reads it back and checks that the loaded song is identical,
+that truncated or padded data is rejected, then compares the loading time with the parsing time
+'''
+import os, sys, glob, time, re
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic import binary_song
+from skymusic.columnar_song import ColumnarSong
+from skymusic.parsers import song_parser
+from skymusic.modes import InstrumentType, RenderMode, CSSMode
+
+def load_lines(path):
+    if path.endswith('.mid'):
+        with open(path, 'rb') as fp:
+            return [fp.read()]
+    with open(path, encoding='utf-8') as fp:
+        return fp.read().split('\n')
+
+def fingerprint(song):
+    return (song.content_hash(), song.get_num_lines(), song.get_num_instruments(), song.get_num_broken(), song.get_meta(),
+            song.render(RenderMode.SKYASCII)[0].getvalue(),
+            re.sub(r'content="[^"]*"', '', song.render(RenderMode.HTML, css_mode=CSSMode.XML)[0].getvalue())) # Without the creation date
+
+def is_rejected(data):
+    try:
+        binary_song.loads(data)
+    except ValueError:
+        return True
+    return False
+
+if __name__ == '__main__':
+
+    t_parse = t_load = 0
+    failures = []
+    for path in sorted(glob.glob(os.path.normpath(os.path.join(SRC_ROOT, '../test_songs/*')))):
+        lines = load_lines(path)
+        for instrument_type in (InstrumentType.HARP, InstrumentType.DRUM):
+            p = song_parser.SongParser(maker=None)
+            p.set_instrument_type(instrument_type)
+            modes = p.get_possible_modes(lines)
+            if not modes: continue
+            p.set_input_mode(modes[0])
+            keys = p.find_key(lines)
+            name = f"{os.path.basename(path)} ({instrument_type.name})"
+            t0 = time.perf_counter()
+            try:
+                song = p.parse_song(lines, keys[0] if keys else 'C', 0)
+            except Exception as err: # Some test songs are not valid in every mode
+                print(f"{name :45s} cannot be parsed: {repr(err)}")
+                continue
+            t_parse += time.perf_counter() - t0
+
+            data = binary_song.dumps(song)
+            t0 = time.perf_counter()
+            loaded_song = binary_song.loads(data)
+            t_load += time.perf_counter() - t0
+
+            if fingerprint(loaded_song) != fingerprint(song):
+                failures.append(name)
+            if fingerprint(binary_song.loads(data, ColumnarSong)) != fingerprint(song):
+                failures.append(name + ' as ColumnarSong')
+            for cut in sorted({12, len(data)//2, len(data) - 1}):
+                if not is_rejected(data[:cut]):
+                    failures.append(f"{name} truncated to {cut} bytes")
+            if not is_rejected(data + b'\x00'):
+                failures.append(name + ' padded')
+            print(f"{name :45s} {song.get_num_instruments() :6d} instruments, {len(data) :7d} bytes")
+
+    print(f"\nParsing: {1000*t_parse :.1f} ms, loading: {1000*t_load :.1f} ms")
+    print("Round trip failed for: " + ', '.join(failures) if failures else "All round trips OK")
@@ -0,0 +1,58 @@
+'''
+Compares the memory footprint and iteration speed of a very long song stored as a Song and as a ColumnarSong,
+and checks that both are rendered identically, have the same content hash, and that iterating over the ColumnarSong
+is no slower than over the Song
+'''
+import os, sys, timeit, tracemalloc
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import song_parser
+from skymusic.modes import RenderMode
+
+FILE = 'threshold.txt'
+REPEATS = 200
+
+def iterate(song):
+    for line in song.get_lines():
+        for instrument in line:
+            instrument.get_repeat()
+
+def statistics(song):
+    song.get_num_instruments()
+    song.get_num_broken()
+    song.get_max_instruments_per_line()
+    song.get_harp_type()
+
+if __name__ == '__main__':
+
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',FILE)), encoding='utf-8') as fp:
+        lines = fp.read().split('\n')*REPEATS
+
+    p = song_parser.SongParser(maker=None)
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    song_key = p.find_key(lines)[0]
+    songs = []
+    memories = []
+    for columnar in (False, True):
+        p.parse_song(lines, song_key, 0, columnar=columnar) # Fills the shared tables of interned grids
+        tracemalloc.start()
+        songs.append(p.parse_song(lines, song_key, 0, columnar=columnar))
+        memories.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+
+    iteration_times = []
+    for (song, memory) in zip(songs, memories):
+        t = min(timeit.repeat(lambda: iterate(song), number=5, repeat=20))/5 # Best of 20, to leave out timer noise
+        iteration_times.append(t)
+        t_stats = timeit.timeit(lambda: statistics(song), number=3)/3
+        print(f"{song.__class__.__name__ :12s} {song.get_num_instruments()} instruments: {memory/1024 :7.0f} kB, "
+              f"iteration {1000*t :6.1f} ms, statistics {1000*t_stats :6.1f} ms")
+
+    renders = [song.render(RenderMode.SKYASCII)[0].getvalue() for song in songs]
+    print("Identical renders: " + str(renders[0] == renders[1]))
+    print("Identical content hashes: " + str(songs[0].content_hash() == songs[1].content_hash()))
+    # A margin of 10% for the remaining noise of timers
+    assert iteration_times[1] <= 1.1*iteration_times[0], "Iterating over the ColumnarSong is slower than over the Song"
+    print("ColumnarSong iteration no slower than Song: True")
@@ -0,0 +1,57 @@
+'''
+Simulates a live editor typing in a long song: times the incremental parse of each edit against a full parse,
+and checks that both songs are identical
+'''
+import os, sys, time
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import song_parser
+from skymusic.parsers.incremental_parser import IncrementalSongParser
+
+FILE = 'redemption.txt'
+REPEATS = 50
+
+def edits(lines):
+    '''
+    Successive versions of the text: a note typed in a line, a line inserted, a line deleted,
+    with the indices of the edited lines of text
+    '''
+    lines = list(lines)
+    lines[100] += ' A1'
+    yield lines, [100]
+    lines = lines[:200] + ['C1 D1 E1'] + lines[200:]
+    yield lines, [200]
+    lines = lines[:300] + lines[301:]
+    yield lines, []
+
+if __name__ == '__main__':
+
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',FILE)), encoding='utf-8') as fp:
+        lines = fp.read().split('\n')*REPEATS
+
+    p = song_parser.SongParser(maker=None)
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    song_key = p.find_key(lines)[0]
+
+    session = IncrementalSongParser(p)
+    t0 = time.perf_counter()
+    session.parse_song(lines, song_key, 0)
+    print(f"First parse of {len(lines)} lines: {1000*(time.perf_counter() - t0) :7.1f} ms")
+
+    failures = []
+    for i, (new_lines, edited_lines) in enumerate(edits(lines)):
+        # Indices of the edited lines in the Song, which skips metadata and empty lines
+        expected_changes = [p.parse_song(new_lines[:index], song_key, 0).get_num_lines() for index in edited_lines]
+        t0 = time.perf_counter()
+        song, changed = session.parse_song(new_lines, song_key, 0)
+        t_incremental = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        full_song = p.parse_song(new_lines, song_key, 0)
+        t_full = time.perf_counter() - t0
+        print(f"Edit {i}: lines {changed} parsed again, incremental {1000*t_incremental :6.1f} ms, full {1000*t_full :6.1f} ms")
+        if song.content_hash() != full_song.content_hash() or changed != expected_changes:
+            failures.append(f"edit {i}")
+
+    print("Incremental parse failed for: " + ', '.join(failures) if failures else "All incremental parses OK")
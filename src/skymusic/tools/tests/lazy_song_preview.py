@@ -0,0 +1,43 @@
+'''
+Times the preview of the first lines of a long song with a LazySong against parsing the whole Song,
+and checks that both songs are identical once the LazySong is fully parsed
+'''
+import os, sys, time
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import song_parser
+from skymusic.modes import RenderMode
+
+FILE = 'redemption.txt'
+REPEATS = 100
+PREVIEW_LINES = 20
+
+def preview(song):
+    '''What a renderer needs for the first page'''
+    song.get_harp_type()
+    song.get_max_instruments_per_line()
+    return [song.get_line(row) for row in range(min(PREVIEW_LINES, song.get_num_lines()))]
+
+if __name__ == '__main__':
+
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',FILE)), encoding='utf-8') as fp:
+        lines = fp.read().split('\n')*REPEATS
+
+    p = song_parser.SongParser(maker=None)
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    song_key = p.find_key(lines)[0]
+
+    songs = []
+    for lazy in (False, True):
+        t0 = time.perf_counter()
+        song = p.parse_song(lines, song_key, 0, lazy=lazy)
+        preview(song)
+        t = time.perf_counter() - t0
+        print(f"{song.__class__.__name__ :8s} {song.get_num_lines()} lines, preview of {PREVIEW_LINES} lines: {1000*t :7.1f} ms")
+        songs.append(song)
+
+    print("Identical content hashes: " + str(songs[0].content_hash() == songs[1].content_hash()))
+    renders = [song.render(RenderMode.SKYASCII)[0].getvalue() for song in songs]
+    print("Identical renders: " + str(renders[0] == renders[1]))
@@ -0,0 +1,63 @@
+'''
+Checks that smf_reader decodes the MIDI test songs into the same events as mido,
+and compares their speed and the memory taken by the decoded files
+'''
+import os, sys, glob, timeit, tracemalloc
+from io import BytesIO
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import smf_reader
+try:
+    import mido
+except (ImportError, ModuleNotFoundError):
+    print("mido is not installed")
+    sys.exit()
+
+EVENT_FIELDS = smf_reader.MidiEvent._fields
+
+def read_mido(midi_bytes):
+    return mido.MidiFile(file=BytesIO(midi_bytes))
+
+def same_events(mido_file, smf_file):
+    if (mido_file.type, mido_file.ticks_per_beat, len(mido_file.tracks)) != (smf_file.type, smf_file.ticks_per_beat, len(smf_file.tracks)):
+        return False
+    for (mido_track, smf_track) in zip(mido_file.tracks, smf_file.tracks):
+        if len(mido_track) != len(smf_track):
+            return False
+        for (msg, event) in zip(mido_track, smf_track):
+            if any(getattr(msg, field, None) != getattr(event, field) for field in EVENT_FIELDS):
+                return False
+    return True
+
+def allocated(read, midi_bytes):
+    tracemalloc.start()
+    midi_file = read(midi_bytes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del midi_file
+    return size
+
+if __name__ == '__main__':
+
+    paths = sorted(glob.glob(os.path.normpath(os.path.join(SRC_ROOT, '../test_songs/*.mid'))))
+    paths += sys.argv[1:]
+
+    failures = []
+    for path in paths:
+        with open(path, 'rb') as fp:
+            midi_bytes = fp.read()
+        try:
+            mido_file = read_mido(midi_bytes)
+        except (IOError, EOFError, ValueError):
+            print(f"{os.path.basename(path) :30s} not readable by mido")
+            continue
+        if not same_events(mido_file, smf_reader.read_smf(midi_bytes)):
+            failures.append(os.path.basename(path))
+        mido_time = timeit.timeit(lambda: read_mido(midi_bytes), number=5)/5
+        smf_time = timeit.timeit(lambda: smf_reader.read_smf(midi_bytes), number=5)/5
+        print(f"{os.path.basename(path) :30s} mido {1000*mido_time :8.2f} ms {allocated(read_mido, midi_bytes)/1024 :8.1f} kB, "
+              f"smf_reader {1000*smf_time :8.2f} ms {allocated(smf_reader.read_smf, midi_bytes)/1024 :8.1f} kB")
+
+    print("Different events for: " + ', '.join(failures) if failures else "Same events with both readers")
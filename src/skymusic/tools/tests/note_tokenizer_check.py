@@ -0,0 +1,32 @@
+'''
+Checks that the trie tokenizer of each notation splits random chords exactly like note_name_regex,
+and compares their speed
+'''
+import os, sys, random, timeit
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers.noteparsers import english, doremi, doremi_jp, jianpu, skyabc15, skykeyboard
+
+NUM_CHORDS = 20000
+PARSERS = [english.English(), doremi.Doremi(), doremi_jp.DoremiJP(), jianpu.Jianpu(), skyabc15.SkyABC15(),
+           skykeyboard.SkyKeyboard(locale='en_US'), skykeyboard.SkyKeyboard(locale='fr_FR')]
+
+def random_chord(note_names, chars):
+    if random.random() < 0.5: # Notes with octaves and other characters
+        return ''.join(random.choice(note_names) + random.choice(['', '1', '2', '+', '-', 'x']) for _ in range(random.randint(0, 4)))
+    else: # Any characters
+        return ''.join(random.choice(chars) for _ in range(random.randint(0, 8)))
+
+if __name__ == '__main__':
+
+    random.seed(0)
+    for parser in PARSERS:
+        note_names = parser.get_note_names()
+        chars = ''.join(set(''.join(note_names))) + ' .-+*x0123456789'
+        chords = [random_chord(note_names, chars) for _ in range(NUM_CHORDS)]
+        mismatches = [chord for chord in chords if parser.split_chord(chord) != parser.note_name_regex.sub(' \\1', chord).split()]
+        t_regex = timeit.timeit(lambda: [parser.note_name_regex.sub(' \\1', chord).split() for chord in chords], number=3)/3
+        t_trie = timeit.timeit(lambda: [parser.split_chord(chord) for chord in chords], number=3)/3
+        print(f"{parser.__class__.__name__ :12s} {len(note_names) :5d} note names, {len(mismatches)} mismatches, regex {1000*t_regex :6.1f} ms, trie {1000*t_trie :6.1f} ms")
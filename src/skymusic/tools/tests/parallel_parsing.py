@@ -0,0 +1,38 @@
+'''
+Times the parsing of a very long song in a single process and in a pool of processes,
+and checks that both songs are identical.
+The pool has at least 2 processes, even on a single CPU, so that it is always tested.
+'''
+import os, sys, time
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import song_parser
+
+FILE = 'redemption.txt'
+REPEATS = 1000
+
+if __name__ == '__main__':
+
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',FILE)), encoding='utf-8') as fp:
+        lines = fp.read().split('\n')
+
+    p = song_parser.SongParser(maker=None)
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    song_key = p.find_key(lines)[0]
+    lines = lines*REPEATS
+
+    max_workers = max(2, os.cpu_count() or 1)
+    songs = []
+    for num_lines in (len(lines), 100): # The short song is parsed in parallel thanks to a lower threshold
+        p._parallel_threshold = min(song_parser.SongParser._parallel_threshold, num_lines)
+        for parallel in (False, True):
+            t0 = time.perf_counter()
+            song = p.parse_song(lines[:num_lines], song_key, 0, parallel=parallel, max_workers=max_workers)
+            t = time.perf_counter() - t0
+            print(f"parallel={parallel!s:5s} {song.get_num_lines()} lines in {max_workers if parallel else 1} processes: {1000*t :7.1f} ms")
+            songs.append(song)
+
+    print("Identical songs: " + str(songs[0].content_hash() == songs[1].content_hash() and
+                                     songs[2].content_hash() == songs[3].content_hash()))
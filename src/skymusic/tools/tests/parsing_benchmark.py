@@ -0,0 +1,49 @@
+'''
+Times the parsing of long songs full of quavers and triplets, and measures their memory footprint,
+with the interned bitmask Skygrid and with the former dict-of-dicts Skygrid
+'''
+import os, sys, timeit, tracemalloc
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic import instruments
+from skymusic.parsers import song_parser
+from skygrid_benchmark import DictSkygrid
+
+FILES = ['threshold.txt', 'redemption.txt']
+REPEATS = 50
+
+def load(file):
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',file)), encoding='utf-8') as fp:
+        return fp.read().split('\n')
+
+def parse(p, lines):
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    return p.parse_song(lines, song_key=p.find_key(lines)[0], octave_shift=0)
+
+def query(song):
+    for line in song.get_lines():
+        for instrument in line:
+            if not isinstance(instrument, instruments.Harp): continue
+            instrument.get_num_frames()
+            instrument.get_num_highlighted()
+            instrument.get_max_num_by_frame()
+
+if __name__ == '__main__':
+
+    p = song_parser.SongParser(maker=None)
+    bitmask_skygrid = instruments.Skygrid
+    for file in FILES:
+        lines = load(file)*REPEATS
+        print(f"{file} x {REPEATS}: {len(lines)} lines")
+        for grid_class in (DictSkygrid, bitmask_skygrid):
+            instruments.Skygrid = grid_class
+            t = timeit.timeit(lambda: parse(p, lines), number=3)/3
+            tracemalloc.start()
+            song = parse(p, lines)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            t_query = timeit.timeit(lambda: query(song), number=3)/3
+            print(f"    {grid_class.__name__ :12s} parse {1000*t :8.1f} ms    counters {1000*t_query :7.1f} ms    song {memory/1024 :7.0f} kB")
+    instruments.Skygrid = bitmask_skygrid
@@ -0,0 +1,57 @@
+'''
+Pickles every song of test_songs/ as Song, ColumnarSong and LazySong, checks that the unpickled songs are identical,
+then renders the songs in worker processes
+'''
+import os, sys, glob, pickle
+from concurrent.futures import ProcessPoolExecutor
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic import binary_song
+from skymusic.parsers import song_parser
+from skymusic.modes import RenderMode
+
+def load_lines(path):
+    if path.endswith('.mid'):
+        with open(path, 'rb') as fp:
+            return [fp.read()]
+    with open(path, encoding='utf-8') as fp:
+        return fp.read().split('\n')
+
+def render(song):
+    return song.render(RenderMode.SKYASCII)[0].getvalue()
+
+if __name__ == '__main__':
+
+    songs = []
+    failures = []
+    for path in sorted(glob.glob(os.path.normpath(os.path.join(SRC_ROOT, '../test_songs/*')))):
+        lines = load_lines(path)
+        p = song_parser.SongParser(maker=None)
+        modes = p.get_possible_modes(lines)
+        if not modes: continue
+        p.set_input_mode(modes[0])
+        keys = p.find_key(lines)
+        name = os.path.basename(path)
+        try:
+            song = p.parse_song(lines, keys[0] if keys else 'C', 0)
+        except Exception as err: # Some test songs cannot be parsed
+            print(f"{name :25s} cannot be parsed: {repr(err)}")
+            continue
+        for options in ({'columnar': True}, {'lazy': True}):
+            other_song = p.parse_song(lines, keys[0] if keys else 'C', 0, **options)
+            if pickle.loads(pickle.dumps(other_song)).content_hash() != song.content_hash():
+                failures.append(f"{name} {options}")
+        data = pickle.dumps(song)
+        unpickled_song = pickle.loads(data)
+        if (unpickled_song.content_hash(), str(unpickled_song), render(unpickled_song)) != (song.content_hash(), str(song), render(song)):
+            failures.append(name)
+        print(f"{name :25s} {song.get_num_instruments() :5d} instruments, pickle {len(data) :7d} bytes, binary {len(binary_song.dumps(song)) :7d} bytes")
+        songs.append(song)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        if list(executor.map(render, songs)) != [render(song) for song in songs]:
+            failures.append('renders in worker processes')
+
+    print("Round trip failed for: " + ', '.join(failures) if failures else "All round trips OK")
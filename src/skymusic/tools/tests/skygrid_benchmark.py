@@ -0,0 +1,146 @@
+'''
+Compares memory and speed of the bitmask Skygrid against the former dict-of-dicts Skygrid,
+and checks that coordinates outside the grid are rejected
+'''
+import os, sys, timeit, tracemalloc, random
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.instruments import Skygrid
+
+NUM_GRIDS = 20000
+
+class DictSkygrid():
+    '''The former Skygrid, kept here as a reference'''
+    def __init__(self, shape=(3,5)):
+        self.shape = shape
+        self.grid = {}
+        self.inverse_grid = {}
+        self._num_by_frame = {}
+
+    def is_in_shape(self, coord):
+        (row, col) = coord
+        return row < self.shape[0] and col < self.shape[1]
+
+    def set_note(self, coord, frame=None, highlighted=True):
+        frames = [frame] if frame is not None else range(0,max(1,self.get_num_frames()))
+        for frame in frames: self.grid[coord] = {frame: highlighted}
+        self._num_by_frame = {}
+        self.inverse_grid = {}
+
+    @classmethod
+    def intern(cls, skygrid):
+        '''The former grids were never shared'''
+        return skygrid
+
+    def get_inverse_grid(self):
+        if not self.inverse_grid:
+            inverse_grid = {}
+            for coord in self.grid:
+                for f in self.grid[coord]:
+                    if self.grid[coord][f]: inverse_grid[f] = inverse_grid.get(f,[]) + [coord]
+            self.inverse_grid = inverse_grid
+        return self.inverse_grid
+
+    def get_highlighted_frames(self, note_coord=None):
+        if note_coord is None:
+            return sorted(self.get_inverse_grid().keys())
+        note_frames = self.grid.get(note_coord, {})
+        return sorted([f for f in note_frames.keys() if note_frames[f] is True])
+
+    def get_highlighted_coords(self, frame=None):
+        inverse_grid = self.get_inverse_grid()
+        frames = [frame] if frame is not None else range(0,self.get_num_frames())
+        highlighted_coords = []
+        for frame in frames:
+            highlighted_coords += list(filter(None,inverse_grid[frame]))
+        return sorted(highlighted_coords)
+
+    def get_num_frames(self):
+        return len(self.get_inverse_grid())
+
+    def get_num_by_frame(self):
+        if not self._num_by_frame:
+            inverse_grid = self.get_inverse_grid()
+            self._num_by_frame = {f: len(inverse_grid[f]) for f in inverse_grid}
+        return self._num_by_frame
+
+    def get_num_highlighted(self, frame=None):
+        if not self._num_by_frame: self.get_num_by_frame()
+        return self._num_by_frame.get(frame, None) if frame is not None else sum(self._num_by_frame.values())
+
+    def get_max_num_by_frame(self):
+        num_by_frame = self.get_num_by_frame()
+        return max(num_by_frame.values()) if num_by_frame else 0
+
+    def get_signature(self):
+        inverse_grid = self.get_inverse_grid()
+        masks = [sum(1 << (1 + row*self.shape[1] + col) for (row, col) in inverse_grid.get(frame, []) if row >= 0)
+                 for frame in range(max(inverse_grid, default=-1) + 1)]
+        return (self.shape, tuple(masks))
+
+
+random.seed(0)
+chords = []
+for i in range(NUM_GRIDS):
+    if i % 4 == 0: # A quaver of 3 notes
+        chords.append([((random.randrange(3), random.randrange(5)), f) for f in (1, 2, 3)])
+    else: # A chord of 1 to 3 notes
+        chords.append([((random.randrange(3), random.randrange(5)), 0) for _ in range(random.randint(1,3))])
+
+def build(grid_class):
+    grids = []
+    for chord in chords:
+        grid = grid_class()
+        for coord, frame in chord: grid.set_note(coord, frame)
+        grids.append(grid)
+    return grids
+
+def query(grids, method):
+    if method == 'get_highlighted_frames(coord)':
+        for grid in grids:
+            for row in range(3):
+                for col in range(5): grid.get_highlighted_frames((row, col))
+    elif method == 'get_highlighted_coords(frame)':
+        for grid in grids:
+            for frame in grid.get_highlighted_frames(): grid.get_highlighted_coords(frame)
+    else:
+        for grid in grids: getattr(grid, method)()
+
+def check_out_of_shape():
+    '''Notes outside a 2*4 drum grid must not be stored as the bit of another note'''
+    grid = Skygrid(shape=(2,4))
+    grid.set_note((1,3), 0)
+    grid.set_note((-1,-1), 0, False)
+    failures = []
+    for coord in ((0,4), (2,0), (2,4)):
+        try:
+            grid.set_note(coord, 0)
+            failures.append(coord)
+        except ValueError:
+            pass
+        if grid.get_highlighted_frames(coord):
+            failures.append(coord)
+    if grid.get_highlighted_coords() != [(1,3)]:
+        failures.append(tuple(grid.get_highlighted_coords()))
+    return failures
+
+METHODS = ['get_highlighted_frames', 'get_highlighted_frames(coord)', 'get_highlighted_coords(frame)',
+           'get_num_highlighted', 'get_max_num_by_frame', 'get_num_frames']
+
+if __name__ == '__main__':
+    failures = check_out_of_shape()
+    print("Out of shape coordinates accepted: " + str(failures) if failures else "Out of shape coordinates rejected")
+    for grid_class in (DictSkygrid, Skygrid):
+        tracemalloc.start()
+        grids = build(grid_class)
+        for method in METHODS: query(grids, method) #Fills the caches of the dict implementation
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{grid_class.__name__}: {memory/NUM_GRIDS :.1f} bytes/grid")
+        t = timeit.timeit(lambda: build(grid_class), number=3)/3
+        print(f"    {'build' :30s} {1000*t :7.1f} ms")
+        for method in METHODS:
+            t = timeit.timeit(lambda: query(grids, method), number=3)/3
+            print(f"    {method :30s} {1000*t :7.1f} ms")
@@ -0,0 +1,59 @@
+'''
+Times the statistics of a 10k-line Song, kept up to date by Song.add_line, against a rescan of all lines at each call
+'''
+import os, sys, timeit
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import song_parser
+from skymusic.song import Song
+
+FILE = 'threshold.txt'
+NUM_LINES = 10000
+CALLS = 100
+
+def rescan(song):
+    '''The former statistics, computed from all the lines'''
+    lines = song.get_lines()
+    num_instruments = sum(map(len, lines))
+    num_broken = 0
+    for line in lines:
+        for instrument in line:
+            try:
+                num_broken += int(instrument.get_is_broken())
+            except AttributeError:
+                pass
+    max_instruments = max(map(len, lines), default=0)
+    harp_type = next((line[0].get_type() for line in lines if line[0].get_is_tonal()), 'harp')
+    aspect_ratio = 1
+    for line in lines:
+        try:
+            aspect_ratio = line[0].get_aspect_ratio()
+            break
+        except AttributeError:
+            pass
+    return (num_instruments, num_broken, max_instruments, harp_type, aspect_ratio)
+
+def counters(song):
+    return (song.get_num_instruments(), song.get_num_broken(), song.get_max_instruments_per_line(),
+            song.get_harp_type(), song.get_harp_aspect_ratio())
+
+if __name__ == '__main__':
+
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',FILE)), encoding='utf-8') as fp:
+        lines = fp.read().split('\n')
+
+    p = song_parser.SongParser(maker=None)
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    short_song = p.parse_song(lines, p.find_key(lines)[0], 0)
+
+    song = Song()
+    while song.get_num_lines() < NUM_LINES:
+        for line in short_song.get_lines(): song.add_line(line)
+    print(f"{song.get_num_lines()} lines, {song.get_num_instruments()} instruments")
+
+    assert counters(song) == rescan(song), "Statistics differ from a rescan of the song"
+    for method in (rescan, counters):
+        t = timeit.timeit(lambda: method(song), number=CALLS)/CALLS
+        print(f"    {method.__name__ :10s} {1e6*t :10.1f} us/call")
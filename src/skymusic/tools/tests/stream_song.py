@@ -0,0 +1,63 @@
+'''
+Streams a long song from a text file, one line of instruments at a time, into a renderer,
+and compares the result and the memory peak with parse_song on the whole text
+'''
+import os, sys, tempfile, time, tracemalloc
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import song_parser
+from skymusic.song import Song
+from skymusic.modes import RenderMode
+
+FILE = 'redemption.txt'
+REPEATS = 200
+
+def render_lines(instrument_lines):
+    '''A render stage consuming one line at a time, keeping only its output'''
+    text = []
+    for line in instrument_lines:
+        text.append(' '.join(str(instrument) for instrument in line))
+    return '\n'.join(text)
+
+if __name__ == '__main__':
+
+    with open(os.path.normpath(os.path.join(SRC_ROOT,'../test_songs',FILE)), encoding='utf-8') as fp:
+        lines = fp.read().split('\n')
+
+    p = song_parser.SongParser(maker=None)
+    p.set_input_mode(p.get_possible_modes(lines)[0])
+    song_key = p.find_key(lines)[0]
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as fp:
+        fp.write('\n'.join(lines*REPEATS))
+        path = fp.name
+
+    try:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        with open(path, encoding='utf-8') as fp:
+            song = p.parse_song(fp.read(), song_key, 0)
+        whole_render = render_lines(song.get_lines())
+        meta = song.get_meta()
+        t = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"parse_song : {1000*t :7.1f} ms, memory peak {peak/1024 :8.0f} kB")
+        del song
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        head = Song(locale=p.locale)
+        with open(path, encoding='utf-8') as fp:
+            stream_render = render_lines(p.stream_song(fp, song_key, 0, song=head))
+        t = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"stream_song: {1000*t :7.1f} ms, memory peak {peak/1024 :8.0f} kB")
+    finally:
+        os.remove(path)
+
+    print("Identical metadata: " + str(head.get_meta() == meta))
+    print("Identical renders: " + str(whole_render == stream_render))
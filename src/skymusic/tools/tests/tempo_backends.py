@@ -0,0 +1,68 @@
+'''
+Checks that the NumPy and pure Python tempo analyses of MusicTheory give the same results,
+on the note times of the JSON test songs and on random note times, and compares their speed
+'''
+import os, sys, glob, json, random, timeit
+this_dir = os.path.join(os.path.dirname(__file__))
+SRC_ROOT = os.path.normpath(os.path.join(this_dir, '../../../'))
+sys.path.append(SRC_ROOT)
+
+from skymusic.parsers import music_theory
+
+def load_times(path):
+    try:
+        with open(path, encoding='utf-8') as fp:
+            songs = json.load(fp)
+    except ValueError:
+        return []
+    songs = songs if isinstance(songs, list) else [songs]
+    return [[note['time'] for note in song['songNotes']] for song in songs
+            if isinstance(song, dict) and len(song.get('songNotes', [])) > 1]
+
+def random_times(num_notes, interval):
+    times = [0]
+    for _ in range(num_notes):
+        times.append(times[-1] + random.choice([interval//2, interval, interval, interval, 2*interval]) + random.randint(-3, 3))
+    return times
+
+def analyze(theory, times):
+    results = [theory.analyze_tempo(times, 20)]
+    try:
+        results.append(theory.analyze_tempo(times, 20, method='spectrum'))
+    except ValueError: # No typical interval between notes
+        results.append(None)
+    return results
+
+def are_close(a, b):
+    if a is None or b is None:
+        return a is b
+    return len(a) == len(b) and all(abs(x - y) <= 1e-6*max(1, abs(x)) for (x, y) in zip(a, b))
+
+if __name__ == '__main__':
+
+    random.seed(0)
+    samples = {}
+    for path in sorted(glob.glob(os.path.normpath(os.path.join(SRC_ROOT, '../test_songs/*')))):
+        for i, times in enumerate(load_times(path)):
+            samples[f"{os.path.basename(path)}[{i}]"] = times
+    for num_notes, interval in ((50, 150), (500, 300), (5000, 200)):
+        samples[f"random {num_notes} notes"] = random_times(num_notes, interval)
+
+    pure_theory = music_theory.MusicTheory(None)
+    pure_theory.use_numpy = False
+    numpy_theory = music_theory.MusicTheory(None)
+    if not numpy_theory.use_numpy:
+        print("NumPy is not installed")
+        sys.exit()
+
+    failures = []
+    for name, times in samples.items():
+        pure_results = analyze(pure_theory, times)
+        numpy_results = analyze(numpy_theory, times)
+        if not all(are_close(a, b) for (a, b) in zip(pure_results, numpy_results)):
+            failures.append(name)
+        pure_time = timeit.timeit(lambda: analyze(pure_theory, times), number=3)/3
+        numpy_time = timeit.timeit(lambda: analyze(numpy_theory, times), number=3)/3
+        print(f"{name :30s} {len(times) :6d} notes: Python {1000*pure_time :8.2f} ms, NumPy {1000*numpy_time :8.2f} ms")
+
+    print("Different results for: " + ', '.join(failures) if failures else "Same results with both backends")